@@ -0,0 +1,148 @@
+"""
+Run the benchmarks from the repository root:
+
+    python -m benchmarks [-b REGEX] [--repeat N] [--json FILE]
+                         [--compare BASELINE] [--threshold RATIO]
+
+Suites follow the asv conventions: classes in `bench_*.py` modules with
+`params`, `param_names` and `setup`, and methods named `time_*` (seconds),
+`peakmem_*` (peak traced memory in bytes) or `track_*` (returned value in
+the method's `unit`). With --compare the run fails when a time or peakmem
+result is worse than the baseline by more than the threshold ratio.
+"""
+import argparse
+import importlib
+import itertools
+import json
+import pkgutil
+import re
+import sys
+import tracemalloc
+from statistics import median
+from time import perf_counter
+
+import benchmarks
+
+KINDS = {'time': 's', 'peakmem': 'bytes', 'track': ''}
+
+
+def discover():
+    for module_info in pkgutil.iter_modules(benchmarks.__path__):
+        if not module_info.name.startswith('bench_'):
+            continue
+        module = importlib.import_module(f'benchmarks.{module_info.name}')
+        for name, suite in vars(module).items():
+            if (isinstance(suite, type) and suite.__module__ == module.__name__
+                    and not name.startswith('_')):
+                yield module_info.name, suite
+
+
+def combinations(suite):
+    params = getattr(suite, 'params', [])
+    if not params:
+        return [()]
+    if not isinstance(params[0], (list, tuple)):
+        params = [params]
+    return list(itertools.product(*params))
+
+
+def measure(suite, method_name, params, repeat):
+    kind = method_name.split('_')[0]
+    if kind == 'time':
+        samples = []
+        for _ in range(repeat):
+            instance = setup(suite, params)
+            start = perf_counter()
+            getattr(instance, method_name)(*params)
+            samples.append(perf_counter() - start)
+        return median(samples)
+    instance = setup(suite, params)
+    if kind == 'peakmem':
+        tracemalloc.start()
+        try:
+            getattr(instance, method_name)(*params)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return getattr(instance, method_name)(*params)
+
+
+def setup(suite, params):
+    instance = suite()
+    if hasattr(instance, 'setup'):
+        instance.setup(*params)
+    return instance
+
+
+def run(pattern, repeat):
+    results = []
+    for module_name, suite in discover():
+        methods = [name for name in dir(suite)
+                   if name.split('_')[0] in KINDS and callable(getattr(suite, name))]
+        for params in combinations(suite):
+            for method_name in methods:
+                name = f'{module_name}.{suite.__name__}.{method_name}'
+                label = f"{name}({', '.join(map(str, params))})"
+                if pattern and not re.search(pattern, label):
+                    continue
+                kind = method_name.split('_')[0]
+                unit = getattr(getattr(suite, method_name), 'unit',
+                               KINDS[kind])
+                value = measure(suite, method_name, params, repeat)
+                print(f'{label:<90} {format_value(value, kind, unit)}',
+                      flush=True)
+                results.append({'name': name, 'params': list(map(str, params)),
+                                'kind': kind, 'value': float(value),
+                                'unit': unit})
+    return results
+
+
+def format_value(value, kind, unit):
+    if kind == 'peakmem':
+        return f'{value / 2 ** 20:11.1f} MB'
+    return f'{value:11.4g} {unit}'
+
+
+def compare(results, baseline, threshold):
+    """
+    Time and peakmem results worse than the baseline by more than the
+    threshold ratio.
+    """
+    previous = {(result['name'], tuple(result['params'])): result['value']
+                for result in baseline}
+    regressions = []
+    for result in results:
+        if result['kind'] not in ('time', 'peakmem'):
+            continue
+        old = previous.get((result['name'], tuple(result['params'])))
+        if old and result['value'] > old * threshold:
+            regressions.append((result, old))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument('-b', '--bench', help='run benchmarks matching REGEX')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='samples of every time benchmark, median is kept')
+    parser.add_argument('--json', help='save the results to FILE')
+    parser.add_argument('--compare', help='baseline saved with --json')
+    parser.add_argument('--threshold', type=float, default=1.1)
+    args = parser.parse_args(argv)
+
+    results = run(args.bench, args.repeat)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for result, old in regressions:
+            print(f"REGRESSION {result['name']}({', '.join(result['params'])})"
+                  f": {old:.4g} -> {result['value']:.4g} {result['unit']}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+from time import perf_counter
+
+import numpy as np
+
+from src.algorithms.models.array_route import ArrayRoute
+from src.algorithms.models.doubly_linked_list import DoublyLinkedList
+from src.algorithms.models.graph_manager import GraphManager
+
+from benchmarks import instances
+
+
+ROUTE_CLASSES = {'DoublyLinkedList': DoublyLinkedList,
+                 'ArrayRoute': ArrayRoute}
+
+
+class Construction:
+    """
+    Building the initial routes of a GraphManager, with the distance
+    matrix already computed.
+    """
+    params = [instances.INSTANCES, ['sequential', 'savings']]
+    param_names = ['instance', 'construction']
+
+    def setup(self, instance, construction):
+        self.node_list = instances.node_list(instance)
+
+    def time_construction(self, instance, construction):
+        GraphManager(self.node_list.copy(), max_cap=instances.MAX_CAP,
+                     vehicles=instances.VEHICLES, construction=construction)
+
+    def peakmem_construction(self, instance, construction):
+        GraphManager(self.node_list.copy(), max_cap=instances.MAX_CAP,
+                     vehicles=instances.VEHICLES, construction=construction)
+
+
+class Swaps:
+    """
+    `handle_swap` of random pairs of customers, each one taken back with
+    `undo`, so every repeat starts from the same solution.
+    """
+    params = [instances.INSTANCES, list(ROUTE_CLASSES)]
+    param_names = ['instance', 'route_class']
+    swaps = 2000
+
+    def setup(self, instance, route_class):
+        self.graph_manager = instances.graph_manager(
+            instance, route_class=ROUTE_CLASSES[route_class])
+        customers = self.graph_manager.customers
+        rng = np.random.default_rng(0)
+        self.pairs = [(customers[i], customers[j]) for i, j in
+                      rng.integers(len(customers), size=(self.swaps, 2))]
+
+    def time_handle_swap(self, instance, route_class):
+        graph_manager = self.graph_manager
+        for node1, node2 in self.pairs:
+            graph_manager.handle_swap(node1, node2)
+            graph_manager.undo()
+
+    def track_swaps_per_second(self, instance, route_class):
+        start = perf_counter()
+        self.time_handle_swap(instance, route_class)
+        return len(self.pairs) / (perf_counter() - start)
+    track_swaps_per_second.unit = 'swaps/s'
+
+
+class TotalLength:
+    """
+    The cached total length and its recomputation from all routes.
+    """
+    params = [instances.INSTANCES]
+    param_names = ['instance']
+
+    def setup(self, instance):
+        self.graph_manager = instances.graph_manager(instance)
+
+    def time_total_length(self, instance):
+        for _ in range(1000):
+            self.graph_manager.total_length
+
+    def time_measure_length(self, instance):
+        sum([cycle._measure_length() for cycle in self.graph_manager.cycles])
@@ -0,0 +1,137 @@
+from time import perf_counter
+
+from src.algorithms.simulated_annealing import SimulatedAnnealing
+from src.algorithms.tabu_search import TabuSearch
+
+from benchmarks import instances
+
+
+class SimulatedAnnealingSuite:
+    """
+    SimulatedAnnealing.optimize with the swaps limited to 10 nearest
+    neighbours, from the savings routes.
+    """
+    params = [instances.INSTANCES]
+    param_names = ['instance']
+    epochs = 20
+    attempts = 500
+
+    def setup(self, instance):
+        self.graph_manager = instances.graph_manager(instance,
+                                                     construction='savings')
+
+    def create(self):
+        return SimulatedAnnealing(self.graph_manager, epochs=self.epochs,
+                                  attempts=self.attempts, initial_temp=10,
+                                  cooling_rate=0.9, seed=0, neighbours=10)
+
+    def time_optimize(self, instance):
+        self.create().optimize()
+
+    def peakmem_optimize(self, instance):
+        self.create().optimize()
+
+    def track_moves_per_second(self, instance):
+        sa = self.create()
+        start = perf_counter()
+        sa.optimize()
+        return self.epochs * self.attempts / (perf_counter() - start)
+    track_moves_per_second.unit = 'moves/s'
+
+    def track_length(self, instance):
+        sa = self.create()
+        sa.optimize()
+        return sa.best_length
+    track_length.unit = 'km'
+
+
+class TabuSearchSuite:
+    """
+    TabuSearch.optimize with candidate lists of 10 nearest neighbours,
+    from the savings routes.
+    """
+    params = [instances.INSTANCES, [('swap',), ('swap', 'relocate',
+                                               'two_opt', 'two_opt_star')]]
+    param_names = ['instance', 'operators']
+    iterations = 100
+
+    def setup(self, instance, operators):
+        self.graph_manager = instances.graph_manager(instance,
+                                                     construction='savings')
+
+    def create(self, operators):
+        return TabuSearch(self.graph_manager, max_iterations=self.iterations,
+                          tabu_size=30, seed=0, operators=operators)
+
+    def time_optimize(self, instance, operators):
+        self.create(operators).optimize()
+
+    def peakmem_optimize(self, instance, operators):
+        self.create(operators).optimize()
+
+    def track_iterations_per_second(self, instance, operators):
+        ts = self.create(operators)
+        start = perf_counter()
+        ts.optimize()
+        return self.iterations / (perf_counter() - start)
+    track_iterations_per_second.unit = 'iterations/s'
+
+    def track_length(self, instance, operators):
+        ts = self.create(operators)
+        ts.optimize()
+        return ts.best_length
+    track_length.unit = 'km'
+
+
+class QualityVsTime:
+    """
+    Best length found by both optimizers with growing budgets, read
+    together with the run time of the same budget.
+    """
+    params = [instances.INSTANCES[:3], ['sa', 'ts'], [1, 4, 16]]
+    param_names = ['instance', 'optimizer', 'budget']
+
+    def setup(self, instance, optimizer, budget):
+        self.graph_manager = instances.graph_manager(instance,
+                                                     construction='savings')
+
+    def create(self, optimizer, budget):
+        if optimizer == 'sa':
+            return SimulatedAnnealing(self.graph_manager, epochs=5 * budget,
+                                      attempts=200, initial_temp=10,
+                                      cooling_rate=0.9 ** (1 / budget),
+                                      seed=0, neighbours=10)
+        return TabuSearch(self.graph_manager, max_iterations=25 * budget,
+                          tabu_size=30, seed=0)
+
+    def time_optimize(self, instance, optimizer, budget):
+        self.create(optimizer, budget).optimize()
+
+    def track_length(self, instance, optimizer, budget):
+        algorithm = self.create(optimizer, budget)
+        algorithm.optimize()
+        return algorithm.best_length
+    track_length.unit = 'km'
+
+
+class CoolingSchedules:
+    """
+    Best length found by SimulatedAnnealing with every cooling schedule,
+    from a hand-set and from the calibrated initial temperature, from the
+    default routes which leave more to improve than the savings ones.
+    """
+    params = [instances.INSTANCES[:3],
+              ['geometric', 'lundy_mees', 'adaptive', 'reheating'],
+              [10, 'auto']]
+    param_names = ['instance', 'schedule', 'initial_temp']
+
+    def setup(self, instance, schedule, initial_temp):
+        self.graph_manager = instances.graph_manager(instance)
+
+    def track_length(self, instance, schedule, initial_temp):
+        sa = SimulatedAnnealing(self.graph_manager, epochs=40, attempts=200,
+                                initial_temp=initial_temp, cooling_rate=0.9,
+                                seed=0, neighbours=10, schedule=schedule)
+        sa.optimize()
+        return sa.best_length
+    track_length.unit = 'km'
@@ -0,0 +1,41 @@
+from functools import lru_cache
+
+import numpy as np
+
+from src.algorithms.models.distance_matrix import DistanceMatrix
+from src.algorithms.models.graph_manager import GraphManager
+from src.algorithms.models.node import NodeList
+from src.utils.generator import generate_node_list
+
+
+DATA_FILE = './data/orders_with_depots.csv'
+SIZES = (100, 1000, 10000)
+INSTANCES = ('orders_with_depots',) + tuple(f'synthetic_{size}'
+                                             for size in SIZES)
+MAX_CAP = 1000
+VEHICLES = 5
+
+
+@lru_cache(maxsize=None)
+def _node_list(instance):
+    if instance == 'orders_with_depots':
+        node_list = NodeList.from_flie(DATA_FILE)
+    else:
+        node_list = generate_node_list(int(instance.split('_')[1]), seed=0)
+    # single precision keeps the 10k stop matrix at 400 MB
+    node_list.distance_matrix = DistanceMatrix.from_node_list(
+        node_list, dtype=np.float32 if len(node_list) > 5000 else np.float64)
+    return node_list
+
+
+def node_list(instance):
+    """
+    NodeList of a benchmark instance with its distance matrix, which is
+    computed once per process and shared by the copies.
+    """
+    return _node_list(instance).copy()
+
+
+def graph_manager(instance, **kwargs):
+    return GraphManager(node_list(instance), max_cap=MAX_CAP,
+                        vehicles=VEHICLES, **kwargs)
@@ -0,0 +1,163 @@
+from abc import ABC, abstractmethod
+from math import log
+
+import numpy as np
+
+
+class Schedule(ABC):
+    """
+    Cooling schedule of SimulatedAnnealing, the temperature of the next
+    epoch from the temperature of the last one.
+
+    `start` is called with the initial temperature before the first epoch.
+    `next` gets the acceptance ratio of the epoch (accepted moves among the
+    feasible ones) and whether it found a new best solution. Temperatures
+    are not rounded, so they get close to but never reach zero in a usable
+    number of epochs.
+    """
+    name = None
+
+    def __init__(self, cooling_rate=0.9) -> None:
+        self.cooling_rate = cooling_rate
+        self.initial_temp = None
+
+    def start(self, temperature):
+        self.initial_temp = temperature
+
+    @abstractmethod
+    def next(self, temperature, acceptance, improved):
+        pass
+
+    def __repr__(self):
+        return f'<Schedule {self.name}>'
+
+
+class Geometric(Schedule):
+    """
+    T * cooling_rate, the classic exponential cooling.
+    """
+    name = 'geometric'
+
+    def next(self, temperature, acceptance, improved):
+        return temperature * self.cooling_rate
+
+
+class LundyMees(Schedule):
+    """
+    T / (1 + beta * T): fast cooling at high temperatures and slow at low
+    ones, where most of the improvement happens. Without beta the first
+    step from the temperature given to `start` cools by cooling_rate like
+    the geometric schedule; it is derived again on every start.
+    """
+    name = 'lundy_mees'
+
+    def __init__(self, cooling_rate=0.9, beta=None) -> None:
+        super().__init__(cooling_rate)
+        self.initial_beta = beta
+        self.beta = beta
+
+    def start(self, temperature):
+        super().start(temperature)
+        if self.initial_beta is not None:
+            self.beta = self.initial_beta
+        elif temperature > 0:
+            self.beta = (1 - self.cooling_rate) / (self.cooling_rate
+                                                   * temperature)
+        else:
+            # frozen from the start, stays at zero
+            self.beta = 0.0
+
+    def next(self, temperature, acceptance, improved):
+        if temperature <= 0:
+            return 0.0
+        return temperature / (1 + self.beta * temperature)
+
+
+class Adaptive(Schedule):
+    """
+    Geometric cooling which steers the acceptance ratio towards target:
+    an epoch accepting more moves than the target cools faster (at most
+    cooling_rate ** max_steps), one accepting fewer cools slower (at least
+    cooling_rate ** min_steps), so few epochs are spent at temperatures
+    where almost everything or almost nothing is accepted.
+    """
+    name = 'adaptive'
+
+    def __init__(self, cooling_rate=0.9, target=0.2, min_steps=0.1,
+                 max_steps=4) -> None:
+        super().__init__(cooling_rate)
+        self.target = target
+        self.min_steps = min_steps
+        self.max_steps = max_steps
+
+    def next(self, temperature, acceptance, improved):
+        steps = min(max(acceptance / self.target, self.min_steps),
+                    self.max_steps)
+        return temperature * self.cooling_rate ** steps
+
+
+class Reheating(Schedule):
+    """
+    Geometric cooling which reheats to factor * initial temperature after
+    patience epochs in a row without a new best solution, to escape the
+    local optimum the search froze in.
+    """
+    name = 'reheating'
+
+    def __init__(self, cooling_rate=0.9, patience=10, factor=0.5) -> None:
+        super().__init__(cooling_rate)
+        self.patience = patience
+        self.factor = factor
+        self.stale = 0
+        self.reheats = 0
+
+    def start(self, temperature):
+        super().start(temperature)
+        self.stale = 0
+        self.reheats = 0
+
+    def next(self, temperature, acceptance, improved):
+        self.stale = 0 if improved else self.stale + 1
+        if self.stale >= self.patience:
+            self.stale = 0
+            self.reheats += 1
+            return self.factor * self.initial_temp
+        return temperature * self.cooling_rate
+
+
+SCHEDULES = {
+    'geometric': Geometric,
+    'lundy_mees': LundyMees,
+    'adaptive': Adaptive,
+    'reheating': Reheating,
+}
+
+
+def create_schedule(schedule, cooling_rate):
+    """
+    Schedule instance from a name (see SCHEDULES) with the cooling rate, or
+    the instance itself.
+    """
+    if isinstance(schedule, str):
+        return SCHEDULES[schedule](cooling_rate)
+    return schedule
+
+
+def initial_temperature(deltas, acceptance=0.1):
+    """
+    Temperature at which a worsening move of the median size among deltas
+    is accepted with probability acceptance, -median / ln(acceptance).
+    The median is not pulled up by the few swaps of distant customers, and
+    the low default acceptance suits runs of tens of epochs, which do not
+    cool down from the classic 0.8 (hot starts split routes that swaps do
+    not merge again). Falls back to 1 when no move in the sample makes the
+    solution worse. acceptance has to be between 0 and 1, both excluded.
+    """
+    if not 0 < acceptance < 1:
+        raise ValueError(
+            f'acceptance must be between 0 and 1, got {acceptance}')
+    deltas = np.asarray(deltas, dtype=np.float64)
+    worse = deltas[deltas > 0]
+    if not len(worse):
+        return 1.0
+    return float(-np.median(worse) / log(acceptance))
@@ -0,0 +1,94 @@
+import json
+from time import perf_counter
+
+
+class Instrumentation:
+    def __init__(self, hooks=None, labels=None, clock=perf_counter) -> None:
+        """
+        Optional profiling of an optimizer: time per phase, counters and
+        event hooks. Pass it as `instrumentation` to SimulatedAnnealing or
+        TabuSearch; without it they skip all of this.
+
+        Args:
+            hooks  : Callables called as hook(event, data) on every event,
+                     e.g. ('epoch', {'epoch': 3, 'length': ...}) from
+                     SimulatedAnnealing or ('iteration', {...}) from
+                     TabuSearch.
+            labels : Labels of the exported metrics, the optimizer sets
+                     'optimizer' unless given.
+            clock  : Time source in seconds.
+
+        Phases are timed as laps: `lap(phase)` adds the time since the
+        previous lap to the phase, so one clock read per step is all the
+        instrumented loops pay. The phases are 'selection' (drawing or
+        choosing moves), 'evaluation' (computing move deltas), 'apply'
+        (making and taking back moves), 'acceptance' and 'copy' (snapshots
+        and copies of solutions).
+        """
+        self.hooks = list(hooks or [])
+        self.labels = dict(labels or {})
+        self.clock = clock
+        # phase -> seconds
+        self.timings = {}
+        # name -> count, e.g. moves_tried, moves_accepted, routes_created
+        self.counters = {}
+        self._last = clock()
+
+    def lap(self, phase=None):
+        now = self.clock()
+        if phase is not None:
+            self.timings[phase] = self.timings.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def emit(self, event, **data):
+        for hook in self.hooks:
+            hook(event, data)
+
+    def to_dict(self):
+        return {'labels': dict(self.labels), 'timings': dict(self.timings),
+                'counters': dict(self.counters)}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_prometheus(self, prefix='vrp'):
+        """
+        Timings and counters in the Prometheus text exposition format.
+        """
+        lines = [
+            f'# HELP {prefix}_phase_seconds_total Time spent in optimizer phases.',
+            f'# TYPE {prefix}_phase_seconds_total counter',
+        ]
+        for phase, seconds in sorted(self.timings.items()):
+            labels = self._labels(phase=phase)
+            lines.append(f'{prefix}_phase_seconds_total{labels} {seconds!r}')
+        for name, value in sorted(self.counters.items()):
+            lines.append(f'# TYPE {prefix}_{name}_total counter')
+            lines.append(f'{prefix}_{name}_total{self._labels()} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def _labels(self, **extra):
+        labels = {**self.labels, **extra}
+        if not labels:
+            return ''
+        pairs = [f'{key}="{self._escape(value)}"'
+                 for key, value in sorted(labels.items())]
+        return '{' + ','.join(pairs) + '}'
+
+    @staticmethod
+    def _escape(value):
+        return (str(value).replace('\\', '\\\\').replace('"', '\\"')
+                .replace('\n', '\\n'))
+
+    def __str__(self) -> str:
+        lines = [f'{phase:<21}: {seconds:.4f} s'
+                 for phase, seconds in sorted(self.timings.items())]
+        lines += [f'{name:<21}: {value}'
+                  for name, value in sorted(self.counters.items())]
+        return '\n'.join(lines)
@@ -0,0 +1,319 @@
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+
+try:
+    from src.algorithms.models.node import Node, NodeList
+    from src.utils.haversine import haversine
+except:
+    from node import Node, NodeList
+    from haversine import haversine
+
+
+class ArrayRoute:
+    def __init__(self, head, max_cap, node_list=None) -> None:
+        """
+        Compact route stored as an array of node ids. Alternative to
+        DoublyLinkedList with the same interface used by GraphManager.
+
+        Args:
+            head     : The first node of the route (usually a depot) or None.
+            max_cap  : Maximal weight of the route.
+            node_list: NodeList the node ids refer to.
+
+        Nodes never carry links to each other, so depots are stored as plain
+        ids and the position of every customer is kept in an index. Weight
+        and length are updated on every change, which makes `append`,
+        `last`, `__len__` and `weight` constant time.
+        """
+        self.max_cap = max_cap
+        self.node_list = node_list
+        self.ids = array('l')
+        # customer node id -> index in self.ids
+        self.positions = {}
+        self._weight = 0
+        self._length = 0.0
+        if head is not None:
+            self.append(head)
+
+    @property
+    def head(self):
+        return self.node_list[self.ids[0]] if self.ids else None
+
+    @property
+    def last(self):
+        return self.node_list[self.ids[-1]] if self.ids else None
+
+    @property
+    def weight(self):
+        return self._weight
+
+    @property
+    def length(self):
+        return round(self.raw_length, 2)
+
+    @property
+    def raw_length(self):
+        return self._length
+
+    def _measure_length(self):
+        ids = self.ids
+        return float(sum([self.distance_by_id(ids[i], ids[i + 1])
+                          for i in range(len(ids) - 1)]))
+
+    def _refresh(self):
+        self.positions = {node_id: index
+                          for index, node_id in enumerate(self.ids)
+                          if not self.node_list[node_id].is_depot}
+        self._weight = sum([node.weight for node in self])
+        self._length = self._measure_length()
+
+    def distance_by_id(self, node_id1, node_id2):
+        return self.node_list.distance_matrix.matrix[node_id1, node_id2]
+
+    def distance(self, node1, node2):
+        if node1 is None or node2 is None:
+            return 0
+        return self.distance_by_id(node1.id, node2.id)
+
+    def neighbours(self, node):
+        index = self.positions[node.id]
+        prev = self.node_list[self.ids[index - 1]] if index > 0 else None
+        next = (self.node_list[self.ids[index + 1]]
+                if index + 1 < len(self.ids) else None)
+        return prev, next
+
+    def __contains__(self, node):
+        """
+        Check if a node, given as a Node or by name, is in the route.
+        """
+        if isinstance(node, str):
+            node = self.node_list.get_node_by_name(node)
+            if node is None:
+                return False
+        if node.is_depot:
+            return node.id in self.ids
+        return node.id in self.positions
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        for node_id in self.ids:
+            yield self.node_list[node_id]
+
+    def __str__(self) -> str:
+        names = ' -> '.join([node.name for node in self])
+        return f"<ArrayRoute (weight: {self.weight}, length: {self.length}) {names} >"
+
+    def get_node_by_name(self, name):
+        node = self.node_list.get_node_by_name(name)
+        if node is not None and node in self:
+            return node
+
+    def to_list(self):
+        return list(self)
+
+    def from_list(self, nodes):
+        if sum([node.weight for node in nodes]) > self.max_cap:
+            raise BaseException('Exceeded max weight. Implement split!')
+        self.ids = array('l', [node.id for node in nodes])
+        self._refresh()
+
+    def swap_delta(self, node1, node2):
+        """
+        Change of the route length caused by swapping two of its nodes,
+        computed from the edges around them only.
+        """
+        d = self.distance_by_id
+        ids = self.ids
+        i, j = sorted([self.positions[node1.id], self.positions[node2.id]])
+        a, b = ids[i], ids[j]
+        if j == i + 1:
+            old = d(ids[i - 1], a) + d(a, b) + d(b, ids[j + 1])
+            new = d(ids[i - 1], b) + d(b, a) + d(a, ids[j + 1])
+        else:
+            old = (d(ids[i - 1], a) + d(a, ids[i + 1])
+                   + d(ids[j - 1], b) + d(b, ids[j + 1]))
+            new = (d(ids[i - 1], b) + d(b, ids[i + 1])
+                   + d(ids[j - 1], a) + d(a, ids[j + 1]))
+        return new - old
+
+    def swap_nodes_by_name(self, name1, name2):
+        """
+        Swap two nodes of the route. Returns the change of the route length.
+        """
+        if name1 == name2:
+            return self.reverse()
+
+        node1 = self.get_node_by_name(name1)
+        node2 = self.get_node_by_name(name2)
+
+        if node1 is None or node2 is None or node1 == node2:
+            return 0  # One or both nodes not found or they are the same node
+
+        return self.swap_nodes(node1, node2)
+
+    def swap_nodes(self, node1, node2):
+        """
+        Swap two different customers of the route. Returns the change of the
+        route length.
+        """
+
+        delta = self.swap_delta(node1, node2)
+        i, j = self.positions[node1.id], self.positions[node2.id]
+        self.ids[i], self.ids[j] = node2.id, node1.id
+        self.positions[node1.id], self.positions[node2.id] = j, i
+        self._length += delta
+        return delta
+
+    def append(self, node):
+        if self.max_cap < self.weight + node.weight:
+            raise BaseException('Exceeded max weight. Implement split!')
+        if self.ids:
+            self._length += self.distance_by_id(self.ids[-1], node.id)
+        if not node.is_depot:
+            self.positions[node.id] = len(self.ids)
+        self.ids.append(node.id)
+        self._weight += node.weight
+
+    def fitting(self, nodes):
+        """
+        Number of the first nodes which can be appended without exceeding
+        the capacity, found in the prefix sums of their weights.
+        """
+        loads = list(accumulate([node.weight for node in nodes],
+                                initial=self.weight))
+        return bisect_right(loads, self.max_cap) - 1
+
+    def insert_after(self, node, new_node):
+        """
+        Insert new_node right after customer node. Returns the change of the
+        route length.
+        """
+        return self._insert(self.positions[node.id] + 1, new_node)
+
+    def insert_before(self, node, new_node):
+        """
+        Insert new_node right before customer node. Returns the change of
+        the route length.
+        """
+        return self._insert(self.positions[node.id], new_node)
+
+    def _insert(self, index, node):
+        if self.max_cap < self.weight + node.weight:
+            raise BaseException('Exceeded max weight. Implement split!')
+        d = self.distance_by_id
+        ids = self.ids
+        delta = (d(ids[index - 1], node.id) + d(node.id, ids[index])
+                 - d(ids[index - 1], ids[index]))
+        ids.insert(index, node.id)
+        self._reindex(index)
+        self._weight += node.weight
+        self._length += delta
+        return delta
+
+    def discard(self, node):
+        """
+        Take a single customer out of the route, its neighbours become
+        adjacent. Returns the change of the route length.
+        """
+        d = self.distance_by_id
+        ids = self.ids
+        index = self.positions.pop(node.id)
+        delta = (d(ids[index - 1], ids[index + 1])
+                 - d(ids[index - 1], node.id) - d(node.id, ids[index + 1]))
+        del ids[index]
+        self._reindex(index)
+        self._weight -= node.weight
+        self._length += delta
+        return delta
+
+    def _reindex(self, start):
+        for index in range(start, len(self.ids)):
+            node_id = self.ids[index]
+            if not self.node_list[node_id].is_depot:
+                self.positions[node_id] = index
+
+    def remove(self, node):
+        index = self.positions[node.id]
+        detached = [self.node_list[node_id] for node_id in self.ids[index:]]
+        del self.ids[index:]
+        self._refresh()
+        # Return the detached sublist
+        return detached
+
+    def attach_sublist(self, nodes):
+        """
+        Append the nodes of a detached sublist, without its closing depot,
+        and close the route at its own depot. Nodes from the first one
+        which exceeds the capacity start a new route, which is returned.
+        The split is found up front from the prefix loads, the rest of the
+        sublist has to fit the new route.
+        """
+        items = nodes[:-1]
+        split = self.fitting(items)
+        for item in items[:split]:
+            self.append(item)
+        # routes end at the depot they start from; routes hold depot ids,
+        # the depots need no copies
+        self.append(self.head)
+        if split == len(items):
+            return None
+
+        # the new route starts and ends at the nearest depot of its first node
+        depot = self.node_list.closest_depot(items[split])
+        new_route = ArrayRoute(head=depot, max_cap=self.max_cap,
+                               node_list=self.node_list)
+        for item in items[split:]:
+            new_route.append(item)
+        new_route.append(depot)
+        return new_route
+
+    def reverse(self):
+        """
+        Reverse the route. Returns the change of the route length.
+        """
+        old_length = self._length
+        self.ids.reverse()
+        self._refresh()
+        return self._length - old_length
+
+    def swap_with(self, other, node, other_node):
+        """
+        Exchange a node of this route with a node of another route without
+        checking capacity. Returns the change of the summed length of both
+        routes.
+        """
+        d = self.distance
+        prev, next = self.neighbours(node)
+        other_prev, other_next = other.neighbours(other_node)
+        delta = (d(prev, other_node) + d(other_node, next)
+                 - d(prev, node) - d(node, next))
+        other_delta = (d(other_prev, node) + d(node, other_next)
+                       - d(other_prev, other_node) - d(other_node, other_next))
+        index = self.positions.pop(node.id)
+        other_index = other.positions.pop(other_node.id)
+        self.ids[index] = other_node.id
+        self.positions[other_node.id] = index
+        other.ids[other_index] = node.id
+        other.positions[node.id] = other_index
+        self._weight += other_node.weight - node.weight
+        self._length += delta
+        other._weight += node.weight - other_node.weight
+        other._length += other_delta
+        return delta + other_delta
+
+
+if __name__ == "__main__":
+    file_path = './data/orders_with_depots.csv'
+    node_list = NodeList.from_flie(file_path)
+    route = ArrayRoute(head=node_list.depot, max_cap=1000, node_list=node_list)
+    for node in node_list[1:4]:
+        route.append(node)
+    route.append(node_list.depot)
+    print(route)
+    route.swap_nodes_by_name('Białystok', 'Chrzanów')
+    print(route)
+    route.reverse()
+    print(route)
@@ -0,0 +1,178 @@
+import heapq
+from math import atan2, cos, radians
+
+import numpy as np
+
+
+def customers_by_depot(node_list):
+    """
+    Customers grouped by their nearest depot (ordered by depot id), in
+    node order.
+    """
+    closest_depot_ids = node_list.closest_depot_ids
+    groups = {}
+    for node in node_list:
+        if not node.is_depot:
+            groups.setdefault(closest_depot_ids[node.id], []).append(node)
+    return {depot_id: groups[depot_id] for depot_id in sorted(groups)}
+
+
+def sequential(node_list, max_cap):
+    """
+    Pack customers into routes in the order of the node list, starting
+    a new route when the next customer does not fit.
+    """
+    cycles = []
+    for customers in customers_by_depot(node_list).values():
+        cur_cycle = []
+        cur_cycle_weight = 0
+        for node in customers:
+            if max_cap >= cur_cycle_weight + node.weight:
+                cur_cycle.append(node)
+                cur_cycle_weight += node.weight
+            else:
+                cycles.append(cur_cycle)
+                cur_cycle = [node]
+                cur_cycle_weight = node.weight
+        if cur_cycle:
+            cycles.append(cur_cycle)
+    return cycles
+
+
+def savings(node_list, max_cap, neighbours=100):
+    """
+    Clarke-Wright savings. Every customer starts in its own route, then
+    routes are merged end to end in order of the saving
+    d(i, depot) + d(depot, j) - d(i, j), kept in a heap, as long as the
+    merged route fits the capacity.
+
+    Args:
+        neighbours : Consider only pairs of each customer with its nearest
+                     customers, all pairs with None. Keeps the heap small
+                     on large instances.
+    """
+    matrix = node_list.distance_matrix.matrix
+    cycles = []
+    for depot_id, customers in customers_by_depot(node_list).items():
+        ids = np.array([node.id for node in customers], dtype=np.int64)
+        if neighbours is None or neighbours >= len(ids) - 1:
+            first, second = np.triu_indices(len(ids), k=1)
+            first, second = ids[first], ids[second]
+        else:
+            _, nearest = node_list.spatial_index(depots=False).query(
+                node_list.lats[ids], node_list.lons[ids], k=neighbours,
+                exclude=ids)
+            first = np.repeat(ids, nearest.shape[1])
+            second = nearest.ravel()
+            # neighbours served from other depots are not merged
+            same_depot = np.isin(second, ids)
+            first, second = first[same_depot], second[same_depot]
+        values = (matrix[first, depot_id] + matrix[depot_id, second]
+                  - matrix[first, second])
+        heap = list(zip((-values).tolist(), first.tolist(), second.tolist()))
+        heapq.heapify(heap)
+        cycles += _merge_routes(customers, heap, node_list, max_cap)
+    return cycles
+
+
+def _merge_routes(customers, heap, node_list, max_cap):
+    # route of every customer as a list of ids, shared by its members
+    routes = {node.id: [node.id] for node in customers}
+    loads = {node.id: node.weight for node in customers}
+    while heap:
+        saving, i, j = heapq.heappop(heap)
+        if saving >= 0:
+            # no merge left which shortens the routes
+            break
+        route_i, route_j = routes[i], routes[j]
+        if route_i is route_j:
+            continue
+        load = loads[route_i[0]] + loads[route_j[0]]
+        if load > max_cap:
+            continue
+        # i and j have to be route ends, which get connected
+        if route_i[-1] == i and route_j[0] == j:
+            merged = route_i + route_j
+        elif route_j[-1] == j and route_i[0] == i:
+            merged = route_j + route_i
+        elif route_i[-1] == i and route_j[-1] == j:
+            merged = route_i + route_j[::-1]
+        elif route_i[0] == i and route_j[0] == j:
+            merged = route_i[::-1] + route_j
+        else:
+            continue
+        for node_id in merged:
+            routes[node_id] = merged
+        loads[merged[0]] = load
+    unique = {id(route): route for route in routes.values()}
+    return [[node_list[node_id] for node_id in route]
+            for route in unique.values()]
+
+
+def sweep(node_list, max_cap):
+    """
+    Sort customers by their polar angle around the depot and pack them into
+    routes in that order, so every route serves one sector.
+    """
+    cycles = []
+    for depot_id, customers in customers_by_depot(node_list).items():
+        depot = node_list[depot_id]
+        scale = cos(radians(depot.lat))
+        customers = sorted(customers, key=lambda node: atan2(
+            node.lat - depot.lat, (node.lon - depot.lon) * scale))
+        cur_cycle = []
+        cur_cycle_weight = 0
+        for node in customers:
+            if max_cap >= cur_cycle_weight + node.weight:
+                cur_cycle.append(node)
+                cur_cycle_weight += node.weight
+            else:
+                cycles.append(cur_cycle)
+                cur_cycle = [node]
+                cur_cycle_weight = node.weight
+        if cur_cycle:
+            cycles.append(cur_cycle)
+    return cycles
+
+
+def nearest_neighbour(node_list, max_cap):
+    """
+    Start at the depot and go to the nearest customer which still fits,
+    a new route starts when none does.
+    """
+    matrix = node_list.distance_matrix.matrix
+    cycles = []
+    for depot_id, customers in customers_by_depot(node_list).items():
+        ids = np.array([node.id for node in customers], dtype=np.int64)
+        weights = node_list.weights[ids]
+        visited = np.zeros(len(ids), dtype=bool)
+        while not visited.all():
+            cycle = []
+            load = 0
+            current = depot_id
+            while True:
+                distances = np.where(
+                    visited | (load + weights > max_cap), np.inf,
+                    matrix[current, ids])
+                index = int(np.argmin(distances))
+                if distances[index] == np.inf:
+                    break
+                visited[index] = True
+                load += weights[index]
+                current = ids[index]
+                cycle.append(node_list[current])
+            if not cycle:
+                # customer heavier than a vehicle, left as it was
+                index = int(np.argmin(visited))
+                visited[index] = True
+                cycle.append(node_list[ids[index]])
+            cycles.append(cycle)
+    return cycles
+
+
+CONSTRUCTIONS = {
+    'sequential': sequential,
+    'savings': savings,
+    'sweep': sweep,
+    'nearest_neighbour': nearest_neighbour,
+}
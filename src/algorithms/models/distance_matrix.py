@@ -0,0 +1,156 @@
+import csv
+
+import numpy as np
+
+try:
+    from src.utils.distance_matrix import build_distance_matrix
+except:
+    from utils.distance_matrix import build_distance_matrix
+
+
+class DistanceMatrix:
+    def __init__(self, matrix) -> None:
+        """
+        Precomputed distances between all nodes of a NodeList.
+
+        Args:
+            matrix : Square array of distances in kilometers, where
+                     matrix[i, j] is the distance from the node with id i
+                     to the node with id j.
+
+        Distances are computed once and looked up by node id afterwards, so
+        route lengths are summed from array reads instead of trigonometry.
+        The matrix is never modified in place (`add_node` returns a new
+        DistanceMatrix), so copies of a solution share it.
+        """
+        # file of a matrix memory-mapped from a DistanceCache, which pickles
+        # as its path, see `__getstate__`
+        self.path = (matrix.filename if isinstance(matrix, np.memmap)
+                     else None)
+        if isinstance(matrix, np.ndarray):
+            # plain view of memory-mapped files, indexing it is faster
+            self.matrix = np.asarray(matrix)
+        else:
+            self.matrix = np.asarray(matrix, dtype=float)
+        # [preallocated array, rows in use], self.matrix is a view of the
+        # array, see `add_node`
+        self._buffer = None
+
+    @classmethod
+    def from_node_list(cls, node_list, dtype=np.float64, chunk_size=None,
+                       cache=None):
+        """
+        Compute great-circle distances between all nodes, see
+        `src.utils.distance_matrix.build_distance_matrix`. With a
+        DistanceCache the matrix is computed once and reused from disk.
+        """
+        if cache is not None:
+            return cls(cache.get_or_build(node_list, dtype=dtype))
+        return cls(build_distance_matrix(node_list, dtype=dtype,
+                                         chunk_size=chunk_size))
+
+    @classmethod
+    def from_file(cls, file_path, node_list):
+        """
+        Load distances from a csv file with city names in the header row and
+        the first column (see `data/distance_matrix.csv`). Rows and columns
+        are reordered to match node ids of the given NodeList.
+        """
+        with open(file_path, mode='r', newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            names = next(reader)[1:]
+            rows = {row[0]: [float(value) for value in row[1:]] for row in reader}
+        columns = {name: index for index, name in enumerate(names)}
+        nodes = list(node_list)
+        matrix = np.zeros((len(nodes), len(nodes)))
+        for node1 in nodes:
+            if node1.name not in rows:
+                raise ValueError(f'{node1.name} is not in {file_path}')
+            row = rows[node1.name]
+            for node2 in nodes:
+                matrix[node1.id, node2.id] = row[columns[node2.name]]
+        return cls(matrix)
+
+    def __getitem__(self, key):
+        return self.matrix[key]
+
+    def __len__(self) -> int:
+        return len(self.matrix)
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __getstate__(self):
+        # process pool workers map the cached file instead of receiving
+        # a copy of the matrix; spare rows of the buffer are never sent
+        if self.path is not None:
+            return {'path': self.path}
+        return {'matrix': self.matrix}
+
+    def __setstate__(self, state):
+        matrix = state.get('matrix')
+        if matrix is None:
+            matrix = np.load(state['path'], mmap_mode='r')
+        self.__init__(matrix)
+
+    def distance(self, node1, node2):
+        return self.matrix[node1.id, node2.id]
+
+    def add_node(self, distances_from, distances_to=None):
+        """
+        New DistanceMatrix with a row and a column for a new node, whose id
+        is the current size of this matrix, which stays as it is.
+
+        Args:
+            distances_from : Distances from the new node to all nodes,
+                             including itself (the last value).
+            distances_to   : Distances from all nodes to the new node, the
+                             same as distances_from by default.
+
+        The matrix grows inside a preallocated buffer with some spare rows,
+        so adding nodes one by one copies the matrix only now and then. The
+        new matrix takes the next spare row of the buffer only when no other
+        matrix sharing the buffer took it already, e.g. when copies of
+        a solution add different nodes; otherwise the buffer is copied.
+        """
+        size = len(self.matrix)
+        buffer = self._buffer
+        if buffer is None or buffer[1] != size or len(buffer[0]) <= size:
+            capacity = size + max(64, size // 8)
+            array = np.empty((capacity, capacity), dtype=self.matrix.dtype)
+            array[:size, :size] = self.matrix
+            buffer = [array, size]
+        array = buffer[0]
+        array[size, :size + 1] = distances_from
+        array[:size + 1, size] = (distances_from if distances_to is None
+                                  else distances_to)
+        buffer[1] = size + 1
+        distance_matrix = DistanceMatrix(array[:size + 1, :size + 1])
+        distance_matrix._buffer = buffer
+        return distance_matrix
+
+    def nearest(self, node_ids, k, candidates=None, chunk_size=1024):
+        """
+        Ids of the k nearest candidates (all nodes by default) of every node
+        in node_ids, a node is never its own neighbour. Rows are ordered by
+        distance and processed in chunks, so only chunk_size rows of the
+        matrix are copied at a time.
+        """
+        node_ids = np.asarray(node_ids, dtype=np.int64)
+        if candidates is None:
+            candidates = np.arange(len(self.matrix))
+        candidates = np.asarray(candidates, dtype=np.int64)
+        k = min(k, len(candidates) - 1)
+        result = np.empty((len(node_ids), max(k, 0)), dtype=np.int64)
+        if k <= 0:
+            return result
+        for start in range(0, len(node_ids), chunk_size):
+            rows = node_ids[start:start + chunk_size]
+            distances = self.matrix[np.ix_(rows, candidates)].astype(float)
+            distances[rows[:, None] == candidates[None, :]] = np.inf
+            nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+            order = np.argsort(np.take_along_axis(distances, nearest, axis=1),
+                               axis=1, kind='stable')
+            result[start:start + chunk_size] = candidates[
+                np.take_along_axis(nearest, order, axis=1)]
+        return result
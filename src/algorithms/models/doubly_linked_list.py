@@ -1,3 +1,6 @@
+from bisect import bisect_right
+from itertools import accumulate
+
 try:
     from src.algorithms.models.node import Node, NodeList
     from src.utils.haversine import haversine
@@ -11,34 +14,75 @@ class DoublyLinkedList:
         self.head = head
         self.max_cap = max_cap
         self.node_list = node_list
+        # cached route weight and unrounded length, None when stale
+        self._weight = None
+        self._length = None
+        # cached last node, None when stale
+        self._tail = None
     
 
     @property
     def weight(self):
-        return sum([node.weight for node in self])
+        if self._weight is None:
+            self._weight = sum([node.weight for node in self])
+        return self._weight
 
     @property
     def length(self):
+        return round(self.raw_length, 2)
+
+    @property
+    def raw_length(self):
+        if self._length is None:
+            self._length = self._measure_length()
+        return self._length
+
+    def _measure_length(self):
         length = 0
         cn = self.head
+        if self.node_list is None:
+            while cn.next:
+                length += haversine(cn.lon, cn.lat, cn.next.lon, cn.next.lat)
+                cn = cn.next
+            return length
+        matrix = self.node_list.distance_matrix.matrix
         while cn.next:
-            length += haversine(cn.lon, cn.lat, cn.next.lon, cn.next.lat)
+            length += matrix[cn.id, cn.next.id]
             cn = cn.next
-        return round(length, 2)
+        return float(length)
+
+    def invalidate(self):
+        self._weight = None
+        self._length = None
+
+    def distance(self, node1, node2):
+        if node1 is None or node2 is None:
+            return 0
+        if self.node_list is None:
+            return haversine(node1.lon, node1.lat, node2.lon, node2.lat)
+        return self.node_list.distance_matrix.matrix[node1.id, node2.id]
+
+    def neighbours(self, node):
+        return node.prev, node.next
 
     @property
     def last(self):
-        cur_node = self.head
-        while cur_node.next:
-            cur_node = cur_node.next
-        return cur_node
+        if self._tail is None and self.head:
+            cur_node = self.head
+            while cur_node.next:
+                cur_node = cur_node.next
+            self._tail = cur_node
+        return self._tail
 
     def __contains__(self, node):
-        if not isinstance(node, str):
-            raise BaseException('Not implemented')
+        """
+        Check if a node, given as a Node or by name, is in the route.
+        """
+        if isinstance(node, str):
+            node_id = self._node_id(node)
         else:
-            names = [node.name for node in self.to_list()]
-            return node in names
+            node_id = node.id
+        return any(item.id == node_id for item in self)
 
     def __len__(self):
         count = 0
@@ -63,10 +107,19 @@ class DoublyLinkedList:
         string = string + current_node.name + ' >'
         return string
 
+    def _node_id(self, name):
+        if self.node_list is None:
+            for item in self:
+                if item.name == name:
+                    return item.id
+            return None
+        return self.node_list.ids_by_name.get(name)
+
     def get_node_by_name(self, name):
+        node_id = self._node_id(name)
         current_node = self.head
         while current_node.next:
-            if current_node.name == name:
+            if current_node.id == node_id:
                 return current_node
             current_node = current_node.next
         return 
@@ -80,21 +133,61 @@ class DoublyLinkedList:
         return result
 
     def from_list(self, nodes):
-        self.head = None
+        if sum([node.weight for node in nodes]) > self.max_cap:
+            raise BaseException('Exceeded max weight. Implement split!')
+        self.head = nodes[0] if nodes else None
+        prev = None
         for node in nodes:
-            print(node)
-            self.append(node)
+            node.prev = prev
+            if prev:
+                prev.next = node
+            prev = node
+        if prev:
+            prev.next = None
+        self.invalidate()
+        self._tail = prev
+
+    def swap_delta(self, node1, node2):
+        """
+        Change of the route length caused by swapping two of its nodes,
+        computed from the edges around them only.
+        """
+        d = self.distance
+        if node2.next is node1:
+            node1, node2 = node2, node1
+        if node1.next is node2:
+            before, after = node1.prev, node2.next
+            old = d(before, node1) + d(node1, node2) + d(node2, after)
+            new = d(before, node2) + d(node2, node1) + d(node1, after)
+        else:
+            old = (d(node1.prev, node1) + d(node1, node1.next)
+                   + d(node2.prev, node2) + d(node2, node2.next))
+            new = (d(node1.prev, node2) + d(node2, node1.next)
+                   + d(node2.prev, node1) + d(node1, node2.next))
+        return new - old
 
     def swap_nodes_by_name(self, name1, name2):
+        """
+        Swap two nodes of the route. Returns the change of the route length.
+        """
         if name1 == name2:
-            self.reverse()
+            return self.reverse()
 
         node1 = self.get_node_by_name(name1)
         node2 = self.get_node_by_name(name2)
 
         if node1 is None or node2 is None or node1 == node2:
-            return  # One or both nodes not found or they are the same node
+            return 0  # One or both nodes not found or they are the same node
+
+        return self.swap_nodes(node1, node2)
 
+    def swap_nodes(self, node1, node2):
+        """
+        Swap two different customers of the route. Returns the change of the
+        route length.
+        """
+
+        delta = self.swap_delta(node1, node2)
         # If the nodes are adjacent, handle it as a special case
         if node1.next is node2:  # Node1 is right before Node2
             self._swap_adjacent_nodes(node1, node2)
@@ -103,6 +196,13 @@ class DoublyLinkedList:
         else:
             # Non-adjacent nodes, swap normally
             self._swap_non_adjacent_nodes(node1, node2)
+        if self._length is not None:
+            self._length += delta
+        if self._tail is node1:
+            self._tail = node2
+        elif self._tail is node2:
+            self._tail = node1
+        return delta
 
     def _swap_adjacent_nodes(self, node1, node2):
         # Assume node1 is right before node2
@@ -143,56 +243,139 @@ class DoublyLinkedList:
             node2.next.prev = node2
             
     def append(self, node):
+        """
+        Link node at the end of the route, in constant time from the cached
+        weight and last node.
+        """
         if self.max_cap < self.weight + node.weight:
             raise BaseException('Exceeded max weight. Implement split!')
         elif not self.head:
             self.head = node
         else:
-            node.prev = self.last
-            self.last.next = node
+            last = self.last
+            node.prev = last
+            last.next = node
+            if self._length is not None:
+                self._length += self.distance(last, node)
+        self._tail = node
+        self._weight += node.weight
+
+    def fitting(self, nodes):
+        """
+        Number of the first nodes which can be appended without exceeding
+        the capacity, found in the prefix sums of their weights.
+        """
+        loads = list(accumulate([node.weight for node in nodes],
+                                initial=self.weight))
+        return bisect_right(loads, self.max_cap) - 1
+
+    def insert_after(self, node, new_node):
+        """
+        Link new_node right after node. Returns the change of the route
+        length.
+        """
+        if self.max_cap < self.weight + new_node.weight:
+            raise BaseException('Exceeded max weight. Implement split!')
+        next = node.next
+        delta = (self.distance(node, new_node) + self.distance(new_node, next)
+                 - self.distance(node, next))
+        new_node.prev, new_node.next = node, next
+        node.next = new_node
+        if next:
+            next.prev = new_node
+        else:
+            self._tail = new_node
+        self._update_caches(new_node.weight, delta)
+        return delta
+
+    def insert_before(self, node, new_node):
+        """
+        Link new_node right before node, which is not the head. Returns the
+        change of the route length.
+        """
+        return self.insert_after(node.prev, new_node)
+
+    def discard(self, node):
+        """
+        Unlink a single node, its neighbours become linked. Returns the
+        change of the route length.
+        """
+        prev, next = node.prev, node.next
+        delta = (self.distance(prev, next) - self.distance(prev, node)
+                 - self.distance(node, next))
+        if prev:
+            prev.next = next
+        else:
+            self.head = next
+        if next:
+            next.prev = prev
+        else:
+            self._tail = prev
+        node.prev, node.next = None, None
+        self._update_caches(-node.weight, delta)
+        return delta
+
+    def _update_caches(self, weight, delta):
+        if self._weight is not None:
+            self._weight += weight
+        if self._length is not None:
+            self._length += delta
 
     def remove(self, node):
+        self._tail = node.prev
         if node.prev:
             node.prev.next = None
         else:
             self.head = None
         node.prev = None
-        # Return the head of the detached sublist
-        return node  
+        self.invalidate()
+        # Return the detached sublist
+        detached = []
+        while node:
+            detached.append(node)
+            node = node.next
+        return detached
           
-    def attach_sublist(self, node):
-        item = node
-        next_item = item.next
-        new_ll = None
-        while next_item:
-            # print('Attaching sublist to', str(self.to_list()) if not new_ll  else str(new_ll.to_list()), 'cw:', self.weight if not new_ll else new_ll.weight)
-            # print('Attaching', item)
+    def attach_sublist(self, nodes):
+        """
+        Append the nodes of a detached sublist, without its closing depot,
+        and close the route at its own depot. Nodes from the first one
+        which exceeds the capacity start a new route, which is returned.
+        The split is found up front from the prefix loads, the rest of the
+        sublist has to fit the new route.
+        """
+        items = nodes[:-1]
+        for item in items:
             item.next = None
-            try:
-                if not new_ll:
-                    self.append(item)
-                else:
-                    new_ll.append(item)
-            except:
-                self.append(self.node_list.get_closest_depot(item))
-                new_ll = DoublyLinkedList(head=self.node_list.get_closest_depot(item), max_cap=self.max_cap, node_list=self.node_list) # node need to be able to find closest depot
-                new_ll.append(item)
-            item = next_item
-            next_item = next_item.next
-
-        if new_ll:
-            new_ll.append(self.node_list.get_closest_depot(item))
-        else:
-            self.append(self.node_list.get_closest_depot(self.last))
-        
+        split = self.fitting(items)
+        for item in items[:split]:
+            self.append(item)
+        # routes end at the depot they start from
+        self.append(self.head.terminal())
+        if split == len(items):
+            return None
+
+        # the new route starts and ends at the nearest depot of its first node
+        depot = self.node_list.closest_depot(items[split])
+        new_ll = DoublyLinkedList(head=depot.terminal(), max_cap=self.max_cap, node_list=self.node_list)
+        for item in items[split:]:
+            new_ll.append(item)
+        new_ll.append(depot.terminal())
         return new_ll
 
     def reverse(self):
+        """
+        Reverse the route. Returns the change of the route length.
+        """
+        old_length = self.raw_length
         nodes = self.to_list()
         for node in nodes:
             node.next, node.prev = node.prev, node.next
         if nodes:
             self.head = nodes[-1]
+            self._tail = nodes[0]
+        self._length = None
+        return self.raw_length - old_length
     
     def swap_single_nodes(self, node1, node2):
         node1.prev.next, node2.prev.next = node2.prev.next, node1.prev.next
@@ -200,6 +383,28 @@ class DoublyLinkedList:
 
         node1.prev, node2.prev = node2.prev, node1.prev
         node1.next, node2.next = node2.next, node1.next
+        self.invalidate()
+
+    def swap_with(self, other, node, other_node):
+        """
+        Exchange a node of this route with a node of another route without
+        checking capacity. Returns the change of the summed length of both
+        routes.
+        """
+        d = self.distance
+        delta = (d(node.prev, other_node) + d(other_node, node.next)
+                 - d(node.prev, node) - d(node, node.next))
+        other_delta = (d(other_node.prev, node) + d(node, other_node.next)
+                       - d(other_node.prev, other_node)
+                       - d(other_node, other_node.next))
+        weight, other_weight = self.weight, other.weight
+        length, other_length = self.raw_length, other.raw_length
+        self.swap_single_nodes(node, other_node)
+        self._weight = weight - node.weight + other_node.weight
+        self._length = length + delta
+        other._weight = other_weight - other_node.weight + node.weight
+        other._length = other_length + other_delta
+        return delta + other_delta
 
             
 if __name__ == "__main__":
@@ -267,7 +472,7 @@ if __name__ == "__main__":
     print(new)
     one = dll.get_node_by_name('Malbork')
     two = new.get_node_by_name('Chrzanów')
-    dll.swap_single_nodes(one, two)
+    dll.swap_with(new, one, two)
     print(dll)
     print(new)
 
@@ -1,23 +1,63 @@
-import random
+import copy
+from collections import namedtuple
+
+import numpy as np
 
 try:
     from src.algorithms.models.doubly_linked_list import DoublyLinkedList
+    from src.algorithms.models.array_route import ArrayRoute
     from src.algorithms.models.node import Node, NodeList
+    from src.algorithms.models.distance_matrix import DistanceMatrix
+    from src.algorithms.models.construction import CONSTRUCTIONS
+    from src.utils.distance_cache import DistanceCache
 except:
     from doubly_linked_list import DoublyLinkedList
+    from array_route import ArrayRoute
     from node import Node, NodeList
+    from distance_matrix import DistanceMatrix
+    from construction import CONSTRUCTIONS
+    from utils.distance_cache import DistanceCache
+
+# neighbour arrays of customers by node id, see `GraphManager.route_arrays`
+RouteArrays = namedtuple('RouteArrays', ['pred', 'succ', 'route_keys', 'loads',
+                                         'prefix', 'positions', 'weights',
+                                         'is_depots', 'lasts'])
+
 
 class GraphManager():
-    def __init__(self, node_list, max_cap, vehicles) -> None:
+    def __init__(self, node_list, max_cap, vehicles,
+                 distance_matrix=None, route_class=DoublyLinkedList,
+                 distance_cache=None, seed=None,
+                 construction='sequential') -> None:
         self.node_list = self.create_node_list(node_list)
+        self.distance_matrix = self.create_distance_matrix(distance_matrix,
+                                                           distance_cache)
+        # DoublyLinkedList or ArrayRoute
+        self.route_class = route_class
         self.max_cap = max_cap
         self.vehicles = vehicles
+        # heuristic of the initial routes, see `construction.CONSTRUCTIONS`
+        self.construction = (CONSTRUCTIONS[construction]
+                             if isinstance(construction, str) else construction)
+        # default random stream of the algorithms working on this solution
+        self.random = np.random.default_rng(seed)
         self.cycles = self.create_cycles()
         self.graphs = self.cycles
+        self._total_length = sum([cycle.raw_length for cycle in self.cycles])
+        # route and position of every customer by node id, see `locate`
+        self.node_routes = [None] * len(self.node_list)
+        self.node_positions = [None] * len(self.node_list)
+        # neighbours of customers as arrays, see `evaluate_swaps`
+        self._create_arrays()
+        for cycle in self.cycles:
+            self.index_cycle(cycle)
+        # how to take back the last move, see `undo`
+        self._last_move = None
+        self._last_delta = 0
 
     @property
     def total_length(self):
-        return  sum([cycle.length for cycle in self.cycles])
+        return round(self._total_length, 2)
     
 
     def create_node_list(self, node_list):
@@ -26,64 +66,449 @@ class GraphManager():
         else:
             return NodeList.from_flie(node_list)
 
+    def create_distance_matrix(self, distance_matrix, distance_cache=None):
+        if distance_cache is not None and not isinstance(distance_cache,
+                                                         DistanceCache):
+            distance_cache = DistanceCache(distance_cache)
+        if distance_cache is not None:
+            self.node_list.distance_cache = distance_cache
+        if distance_matrix is None:
+            distance_matrix = self.node_list.distance_matrix
+        elif isinstance(distance_matrix, DistanceMatrix):
+            pass
+        elif distance_cache is not None:
+            distance_matrix = DistanceMatrix(
+                distance_cache.import_file(distance_matrix, self.node_list))
+        else:
+            distance_matrix = DistanceMatrix.from_file(distance_matrix,
+                                                       self.node_list)
+        self.node_list.distance_matrix = distance_matrix
+        return distance_matrix
+
     def create_cycles(self):
-        non_depots = [node for node in self.node_list if not node.is_depot]
-        # random.shuffle(non_depots)
+        # customers of one depot form routes together, which start and end
+        # in that depot
+        cycles = self.construction(self.node_list, self.max_cap)
         result = []
-        cycles = []
-        cur_cycle = []
-        for node in non_depots:
-            cur_cycle_weight = sum([i.weight for i in cur_cycle])
-            if self.max_cap >= cur_cycle_weight + node.weight:
-                cur_cycle.append(node)
-            else:
-                cycles.append(cur_cycle)
-                cur_cycle = []
-                cur_cycle.append(node)
-        if cur_cycle:
-            cycles.append(cur_cycle)
         for cycle in cycles:
-            start = self.node_list.get_closest_depot(cycle[0])
-            end = self.node_list.get_closest_depot(cycle[-1])
-            dll = DoublyLinkedList(head=start, max_cap=self.max_cap,
-                                   node_list=self.node_list)
-            for node in cycle:
-                dll.append(node)
-            dll.append(end)
-            result.append(dll)
+            depot = self.node_list.closest_depot(cycle[0])
+            start, end = self._terminal(depot), self._terminal(depot)
+            route = self.route_class(head=None, max_cap=self.max_cap,
+                                     node_list=self.node_list)
+            route.from_list([start] + cycle + [end])
+            result.append(route)
         return result
     
+    def index_cycle(self, cycle):
+        for position, node in enumerate(cycle):
+            if not node.is_depot:
+                self.node_routes[node.id] = cycle
+                self.node_positions[node.id] = position
+        self._changed[id(cycle)] = cycle
+
+    def _swap_index(self, node1, node2):
+        routes, positions = self.node_routes, self.node_positions
+        routes[node1.id], routes[node2.id] = routes[node2.id], routes[node1.id]
+        positions[node1.id], positions[node2.id] = (positions[node2.id],
+                                                    positions[node1.id])
+
+    def locate(self, node):
+        """
+        Route of a customer and its position in the route.
+        """
+        return self.node_routes[node.id], self.node_positions[node.id]
+
+    def get_cycle_by_node(self, node):
+        return self.node_routes[node.id]
+
+    @property
+    def customers(self):
+        """
+        Customers served by the routes, removed ones are left out.
+        """
+        return [node for node in self.node_list
+                if self.node_routes[node.id] is not None]
+
+    def neighbourhood(self, nodes, k=10):
+        """
+        Ids of the served customers among nodes and their k nearest served
+        customers, the part of the solution to reoptimize after a change.
+        """
+        node_list = self.node_list
+        ids = np.array([node.id for node in nodes], dtype=np.int64)
+        _, nearest = node_list.spatial_index(depots=False).query(
+            node_list.lats[ids], node_list.lons[ids], k=k)
+        ids = np.union1d(ids, nearest.ravel())
+        return [node_id for node_id in ids.tolist()
+                if self.node_routes[node_id] is not None]
+
+    def add_customer(self, name, lat, lon, weight):
+        """
+        Add a new order to the problem and insert it into the solution at
+        the cheapest position, see `insert_customer`. Returns the node.
+        """
+        node = self.node_list.add(name, lat, lon, weight)
+        self.distance_matrix = self.node_list.distance_matrix
+        self.node_routes.append(None)
+        self.node_positions.append(None)
+        self._weights = np.append(self._weights, float(weight))
+        self._pred = np.append(self._pred, 0)
+        self._succ = np.append(self._succ, 0)
+        self._route_keys = np.append(self._route_keys, 0)
+        self._loads = np.append(self._loads, 0.0)
+        self._prefix = np.append(self._prefix, 0.0)
+        self._positions = np.append(self._positions, 0)
+        self._lasts = np.append(self._lasts, 0)
+        self.insert_customer(node)
+        return node
+
+    def cheapest_insertion(self, node):
+        """
+        Cheapest feasible position of a customer which is not in the
+        solution, evaluated for all edges of all routes at once. Returns
+        (delta, customer id, after) where the node goes before (or after)
+        that customer, or None when no route has room for it.
+        """
+        if self._changed:
+            self._refresh_arrays()
+        d = self.distance_matrix.matrix
+        x = node.id
+        served = np.flatnonzero(self._route_keys)
+        served = served[self._loads[served] + self._weights[x] <= self.max_cap]
+        if len(served) == 0:
+            return None
+        pred, succ = self._pred[served], self._succ[served]
+        before = d[pred, x] + d[x, served] - d[pred, served]
+        # the edge to the closing depot is only entered after the last
+        # customer
+        after = np.where(self.node_list.is_depots[succ],
+                         d[served, x] + d[x, succ] - d[served, succ], np.inf)
+        best_before, best_after = np.argmin(before), np.argmin(after)
+        if after[best_after] < before[best_before]:
+            return float(after[best_after]), int(served[best_after]), True
+        return float(before[best_before]), int(served[best_before]), False
+
+    def insert_customer(self, node):
+        """
+        Insert a customer which is not in the solution at its cheapest
+        position, or into a new route from its nearest depot when the
+        routes are full or a new route is cheaper. Returns the change of
+        the total length. Not undoable with `undo`.
+        """
+        depot = self.node_list.closest_depot(node)
+        new_route_length = (self.distance_matrix.matrix[depot.id, node.id]
+                            + self.distance_matrix.matrix[node.id, depot.id])
+        best = self.cheapest_insertion(node)
+        if best is None or new_route_length < best[0]:
+            cycle = self.route_class(head=None, max_cap=self.max_cap,
+                                     node_list=self.node_list)
+            cycle.from_list([self._terminal(depot), node,
+                             self._terminal(depot)])
+            self.cycles.append(cycle)
+            delta = cycle.raw_length
+        else:
+            _, customer_id, after = best
+            customer = self.node_list[customer_id]
+            cycle = self.node_routes[customer_id]
+            if after:
+                delta = cycle.insert_after(customer, node)
+            else:
+                delta = cycle.insert_before(customer, node)
+        self.index_cycle(cycle)
+        self._total_length += delta
+        self._last_move = None
+        return delta
+
+    def remove_customer(self, node):
+        """
+        Take a customer (e.g. a cancelled order) out of the solution, its
+        neighbours become adjacent. A route left without customers is
+        dropped. Returns the change of the total length. The node stays
+        in the node list, so ids do not change.
+        """
+        cycle = self.node_routes[node.id]
+        if cycle is None:
+            return 0
+        if len(cycle) <= 3:
+            self.cycles = [other for other in self.cycles if other is not cycle]
+            self.graphs = self.cycles
+            delta = -cycle.raw_length
+        else:
+            delta = cycle.discard(node)
+            self.index_cycle(cycle)
+        self.node_routes[node.id] = None
+        self.node_positions[node.id] = None
+        self._route_keys[node.id] = 0
+        self._total_length += delta
+        self._last_move = None
+        return delta
+
     def get_cycle_by_node_name(self, node_name):
-        for cycle in self.cycles:
-            if node_name in cycle:
-                return cycle
+        node = self.node_list.get_node_by_name(node_name)
+        if node is not None:
+            return self.get_cycle_by_node(node)
     
     def handle_swap(self, node1, node2, single_node=False):
-        if node1.name == node2.name:
-            cycle = self.get_cycle_by_node_name(node1.name)
-            cycle.reverse()
+        """
+        Swap two nodes of the solution in place, or reverse the route when
+        both nodes are the same. Returns the change of the total length,
+        computed from the edges touched by the move, and updates the cached
+        total. The move can be taken back with `undo`.
+        """
+        if node1.id == node2.id:
+            cycle = self.get_cycle_by_node(node1)
+            delta = cycle.reverse()
+            self.index_cycle(cycle)
+            self._last_move = ('reverse', cycle)
         else:
-            cycle1 = self.get_cycle_by_node_name(node1.name)
-            cycle2 = self.get_cycle_by_node_name(node2.name)
+            cycle1 = self.get_cycle_by_node(node1)
+            cycle2 = self.get_cycle_by_node(node2)
             if cycle1 == cycle2:
-                cycle1.swap_nodes_by_name(node1.name, node2.name)
+                delta = cycle1.swap_nodes(node1, node2)
+                self._swap_index(node1, node2)
+                self._changed[id(cycle1)] = cycle1
+                self._last_move = ('swap', cycle1, node1, node2)
+            elif self.fits(cycle1, node1, node2) and self.fits(cycle2, node2, node1):
+                delta = cycle1.swap_with(cycle2, node1, node2)
+                self._swap_index(node1, node2)
+                self._changed[id(cycle1)] = cycle1
+                self._changed[id(cycle2)] = cycle2
+                self._last_move = ('exchange', cycle1, cycle2, node1, node2)
+            elif (single_node or not self.split_fits(node1, node2)
+                    or not self.split_fits(node2, node1)):
+                # only whole nodes are exchanged, or a split route would
+                # still exceed the capacity; rejected before any change
+                delta = 0
+                self._last_move = None
             else:
-                if single_node:
-                    print(node1)
-                    print(node2)
-                    print(cycle1)
-                    print(cycle2)
-                    cycle1.swap_nodes_by_name(node1, node2)
-                else:
-                    cycle1.swap_single_nodes(node1, node2)
-                    detached_1 = cycle1.remove(node1)
-                    detached_2 = cycle2.remove(node2)
-                    leftover_1 = cycle1.attach_sublist(detached_2)
-                    leftover_2 = cycle2.attach_sublist(detached_1)
-                    if leftover_1:
-                        self.cycles.append(leftover_1)
-                    if leftover_2:
-                        self.cycles.append(leftover_2)
+                self._last_move = ('split', len(self.cycles),
+                                   (cycle1, cycle1.to_list()),
+                                   (cycle2, cycle2.to_list()))
+                old_length = cycle1.raw_length + cycle2.raw_length
+                detached_1 = cycle1.remove(node1)
+                detached_2 = cycle2.remove(node2)
+                # each route keeps its tail, with the other node in front
+                detached_1[0], detached_2[0] = node2, node1
+                leftover_1 = cycle1.attach_sublist(detached_1)
+                leftover_2 = cycle2.attach_sublist(detached_2)
+                delta = cycle1.raw_length + cycle2.raw_length - old_length
+                self.index_cycle(cycle1)
+                self.index_cycle(cycle2)
+                if leftover_1:
+                    self.cycles.append(leftover_1)
+                    self.index_cycle(leftover_1)
+                    delta += leftover_1.raw_length
+                if leftover_2:
+                    self.cycles.append(leftover_2)
+                    self.index_cycle(leftover_2)
+                    delta += leftover_2.raw_length
+        self._total_length += delta
+        self._last_delta = delta
+        return delta
+
+    def undo(self):
+        """
+        Take back the last move made by `handle_swap`.
+        """
+        if self._last_move is None:
+            return
+        kind, *args = self._last_move
+        if kind == 'reverse':
+            cycle, = args
+            cycle.reverse()
+            self.index_cycle(cycle)
+        elif kind == 'swap':
+            cycle, node1, node2 = args
+            cycle.swap_nodes(node1, node2)
+            self._swap_index(node1, node2)
+            self._changed[id(cycle)] = cycle
+        elif kind == 'rebuild':
+            cycles, saved = args
+            self.cycles[:] = cycles
+            for cycle, nodes in saved:
+                cycle.from_list(nodes)
+                self.index_cycle(cycle)
+        elif kind == 'exchange':
+            cycle1, cycle2, node1, node2 = args
+            cycle1.swap_with(cycle2, node2, node1)
+            self._swap_index(node1, node2)
+            self._changed[id(cycle1)] = cycle1
+            self._changed[id(cycle2)] = cycle2
+        else:
+            cycles_count, *saved = args
+            del self.cycles[cycles_count:]
+            for cycle, nodes in saved:
+                cycle.from_list(nodes)
+                self.index_cycle(cycle)
+        self._total_length -= self._last_delta
+        self._last_move = None
+
+    def snapshot(self):
+        """
+        Compact copy of the routes as tuples of node ids, cheap to store and
+        to send between processes. See `restore`.
+        """
+        return tuple(tuple(node.id for node in cycle) for cycle in self.cycles)
+
+    def restore(self, snapshot):
+        """
+        Rebuild the routes from a `snapshot`.
+        """
+        cycles = []
+        for node_ids in snapshot:
+            nodes = [self.node_list[node_id] for node_id in node_ids]
+            nodes = [self._terminal(node) if node.is_depot else node
+                     for node in nodes]
+            cycle = self.route_class(head=None, max_cap=self.max_cap,
+                                     node_list=self.node_list)
+            cycle.from_list(nodes)
+            cycles.append(cycle)
+        self.cycles = cycles
+        self.graphs = self.cycles
+        self._total_length = sum([cycle.raw_length for cycle in self.cycles])
+        # customers missing in the snapshot are not served
+        self.node_routes = [None] * len(self.node_list)
+        self.node_positions = [None] * len(self.node_list)
+        self._create_arrays()
+        for cycle in self.cycles:
+            self.index_cycle(cycle)
+        self._last_move = None
+
+    def __deepcopy__(self, memo):
+        # copying linked nodes recursively overflows the stack on long
+        # routes, so the copy gets its own nodes and is rebuilt from a
+        # snapshot
+        solution = copy.copy(self)
+        solution.random = copy.deepcopy(self.random)
+        solution.node_list = self.node_list.copy()
+        solution.restore(self.snapshot())
+        return solution
+
+    def _terminal(self, depot):
+        return depot.terminal()
+
+    def _create_arrays(self):
+        size = len(self.node_list)
+        self._weights = self.node_list.weights.astype(float)
+        self._pred = np.zeros(size, dtype=np.int64)
+        self._succ = np.zeros(size, dtype=np.int64)
+        self._route_keys = np.zeros(size, dtype=np.int64)
+        self._loads = np.zeros(size, dtype=float)
+        # load of the route up to the customer and its position in the route
+        self._prefix = np.zeros(size, dtype=float)
+        self._positions = np.zeros(size, dtype=np.int64)
+        # last customer of the route, followed by the depot the route
+        # started from
+        self._lasts = np.zeros(size, dtype=np.int64)
+        # routes changed since the arrays were last refreshed, by id
+        self._changed = {}
+
+    def _refresh_arrays(self):
+        live = {id(cycle) for cycle in self.cycles}
+        for key, cycle in self._changed.items():
+            # routes removed by `undo` are skipped, their nodes were
+            # indexed again in the routes they came back to
+            if key not in live:
+                continue
+            ids = np.array([node.id for node in cycle], dtype=np.int64)
+            customers = ids[1:-1]
+            self._pred[customers] = ids[:-2]
+            self._succ[customers] = ids[2:]
+            self._route_keys[customers] = key
+            self._loads[customers] = cycle.weight
+            self._prefix[customers] = np.cumsum(self._weights[ids])[1:-1]
+            self._positions[customers] = np.arange(1, len(ids) - 1)
+            self._lasts[customers] = ids[-2]
+        self._changed = {}
+
+    def route_arrays(self):
+        """
+        Predecessor, successor, route key, route load, load up to the
+        customer, position in the route and last customer of the route of
+        every customer by node id,
+        refreshed for the routes changed since the last call. Move
+        operators evaluate moves from these arrays, see `moves.py`.
+        """
+        if self._changed:
+            self._refresh_arrays()
+        return RouteArrays(self._pred, self._succ, self._route_keys,
+                           self._loads, self._prefix, self._positions,
+                           self._weights, self.node_list.is_depots,
+                           self._lasts)
+
+    def apply_move(self, operator, a, b):
+        """
+        Make a move of an operator from `moves.py` on customers with ids
+        a and b by rebuilding the routes it changes. Routes left without
+        customers are dropped. Returns the change of the total length, the
+        move can be taken back with `undo`.
+        """
+        rebuilt = operator.rebuild(self, a, b)
+        saved = [(cycle, cycle.to_list()) for cycle, _ in rebuilt]
+        self._last_move = ('rebuild', list(self.cycles), saved)
+        # old lengths first, linked routes share the moved nodes
+        delta = -sum([cycle.raw_length for cycle, _ in rebuilt])
+        for cycle, nodes in rebuilt:
+            cycle.from_list(nodes)
+            if len(nodes) > 2:
+                delta += cycle.raw_length
+                self.index_cycle(cycle)
+            else:
+                self.cycles[:] = [other for other in self.cycles
+                                  if other is not cycle]
+        self._total_length += delta
+        self._last_delta = delta
+        return delta
+
+    def evaluate_swaps(self, first, second):
+        """
+        Evaluate swaps of customers first[i] and second[i] (arrays of node
+        ids) in one batch. Returns the changes of the total length and
+        whether each swap is made without splitting a route, i.e. is within
+        one route or keeps both routes within capacity. Deltas are the same
+        as returned by `handle_swap` for such swaps.
+        """
+        if self._changed:
+            self._refresh_arrays()
+        d = self.distance_matrix.matrix
+        a, b = np.asarray(first), np.asarray(second)
+        pa, sa = self._pred[a], self._succ[a]
+        pb, sb = self._pred[b], self._succ[b]
+        deltas = (d[pa, b] + d[b, sa] + d[pb, a] + d[a, sb]
+                  - d[pa, a] - d[a, sa] - d[pb, b] - d[b, sb])
+        # adjacent nodes share an edge, which the formula above breaks
+        after = sa == b
+        deltas[after] = (d[pa, b] + d[b, a] + d[a, sb]
+                         - d[pa, a] - d[a, b] - d[b, sb])[after]
+        before = sb == a
+        deltas[before] = (d[pb, a] + d[a, b] + d[b, sa]
+                          - d[pb, b] - d[b, a] - d[a, sa])[before]
+        same = self._route_keys[a] == self._route_keys[b]
+        w_a, w_b = self._weights[a], self._weights[b]
+        feasible = same | ((self._loads[a] - w_a + w_b <= self.max_cap)
+                           & (self._loads[b] - w_b + w_a <= self.max_cap))
+        feasible &= a != b
+        return deltas, feasible
+
+    def fits(self, cycle, node, new_node):
+        """
+        Check if the cycle stays within capacity when node is replaced
+        with new_node.
+        """
+        return cycle.weight - node.weight + new_node.weight <= self.max_cap
+
+    def split_fits(self, node, new_node):
+        """
+        Check, from the prefix loads of the route of node, if the route split
+        at node with new_node in front of its tail (see `handle_swap`) fits
+        into at most two routes: new_node joins the head of the route or
+        starts a new route with the tail.
+        """
+        arrays = self.route_arrays()
+        head = arrays.prefix[node.id] - node.weight
+        tail = arrays.loads[node.id] - arrays.prefix[node.id]
+        return (head + new_node.weight <= self.max_cap
+                or new_node.weight + tail <= self.max_cap)
 
     
     def __str__(self) -> str:
@@ -0,0 +1,383 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+def segment_end(arrays, start, length):
+    """
+    Last customer of the segment of at most length customers which starts
+    at start and does not go past the end of its route.
+    """
+    end = start
+    for _ in range(length - 1):
+        following = arrays.succ[end]
+        end = np.where(arrays.is_depots[following], end, following)
+    return end
+
+
+def segment_load(arrays, start, end):
+    return arrays.prefix[end] - arrays.prefix[start] + arrays.weights[start]
+
+
+def segment_ids(graph_manager, start, end):
+    """
+    Ids of the customers of one route from start to end, both included.
+    """
+    nodes = graph_manager.node_routes[start].to_list()
+    positions = graph_manager.node_positions
+    return [node.id for node in nodes[positions[start]:positions[end] + 1]]
+
+
+class Move(ABC):
+    """
+    Move operator on a pair of customers (a, b).
+
+    `evaluate` computes the change of the total length and the feasibility
+    of the move for arrays of pairs at once, from the neighbour arrays of
+    GraphManager (`route_arrays`) in O(1) per pair, assuming symmetric
+    distances. It also works for single pairs. `apply` makes the move and
+    returns the change of the total length, `GraphManager.undo` takes it
+    back. `edges` returns the edges added and removed by the move, as
+    pairs of node ids, and `moved` the customers whose position changes,
+    as (node id, route before, route after).
+
+    Operators which are not symmetric (`symmetric = False`) make
+    a different move for (b, a) than for (a, b).
+    """
+    name = None
+    symmetric = True
+
+    @abstractmethod
+    def evaluate(self, graph_manager, a, b):
+        pass
+
+    def apply(self, graph_manager, a, b):
+        return graph_manager.apply_move(self, a, b)
+
+    @abstractmethod
+    def rebuild(self, graph_manager, a, b):
+        """
+        New node lists of the routes changed by the move, as a list of
+        (route, nodes).
+        """
+        pass
+
+    @abstractmethod
+    def edges(self, graph_manager, a, b):
+        pass
+
+    @abstractmethod
+    def moved(self, graph_manager, a, b):
+        pass
+
+    def __repr__(self):
+        return f'<Move {self.name}>'
+
+
+class Swap(Move):
+    """
+    Exchange two customers, in one route or between routes. Swaps between
+    routes which do not fit the capacity split the routes, see
+    `GraphManager.handle_swap`; `evaluate` marks them infeasible.
+    """
+    name = 'swap'
+
+    def evaluate(self, graph_manager, a, b):
+        deltas, feasible = graph_manager.evaluate_swaps(np.atleast_1d(a),
+                                                        np.atleast_1d(b))
+        if np.ndim(a) == 0:
+            return deltas[0], feasible[0]
+        return deltas, feasible
+
+    def apply(self, graph_manager, a, b):
+        node_list = graph_manager.node_list
+        return graph_manager.handle_swap(node_list[a], node_list[b])
+
+    def rebuild(self, graph_manager, a, b):
+        """
+        Routes with a and b exchanged, without the splits of `apply`.
+        """
+        cycle1, cycle2 = graph_manager.node_routes[a], graph_manager.node_routes[b]
+        i, j = graph_manager.node_positions[a], graph_manager.node_positions[b]
+        nodes1 = cycle1.to_list()
+        if cycle1 is cycle2:
+            nodes1[i], nodes1[j] = nodes1[j], nodes1[i]
+            return [(cycle1, nodes1)]
+        nodes2 = cycle2.to_list()
+        nodes1[i], nodes2[j] = nodes2[j], nodes1[i]
+        return [(cycle1, nodes1), (cycle2, nodes2)]
+
+    def edges(self, graph_manager, a, b):
+        if a == b:
+            return [], []
+        arrays = graph_manager.route_arrays()
+        pa, sa = int(arrays.pred[a]), int(arrays.succ[a])
+        pb, sb = int(arrays.pred[b]), int(arrays.succ[b])
+        removed = [(pa, a), (a, sa), (pb, b), (b, sb)]
+        added = [(pa, b), (b, sa), (pb, a), (a, sb)]
+        return added, removed
+
+    def moved(self, graph_manager, a, b):
+        if a == b:
+            return []
+        cycle1, cycle2 = graph_manager.node_routes[a], graph_manager.node_routes[b]
+        return [(a, cycle1, cycle2), (b, cycle2, cycle1)]
+
+
+class TwoOpt(Move):
+    """
+    Reverse the part of a route from a to b (intra-route 2-opt).
+    """
+    name = 'two_opt'
+
+    def evaluate(self, graph_manager, a, b):
+        arrays = graph_manager.route_arrays()
+        d = graph_manager.distance_matrix.matrix
+        first = arrays.positions[a] < arrays.positions[b]
+        i, j = np.where(first, a, b), np.where(first, b, a)
+        pi, sj = arrays.pred[i], arrays.succ[j]
+        deltas = d[pi, j] + d[i, sj] - d[pi, i] - d[j, sj]
+        feasible = (arrays.route_keys[a] == arrays.route_keys[b]) & (a != b)
+        return deltas, feasible
+
+    def rebuild(self, graph_manager, a, b):
+        cycle = graph_manager.node_routes[a]
+        i, j = sorted([graph_manager.node_positions[a],
+                       graph_manager.node_positions[b]])
+        nodes = cycle.to_list()
+        return [(cycle, nodes[:i] + nodes[i:j + 1][::-1] + nodes[j + 1:])]
+
+    def edges(self, graph_manager, a, b):
+        arrays = graph_manager.route_arrays()
+        if arrays.positions[a] > arrays.positions[b]:
+            a, b = b, a
+        pa, sb = int(arrays.pred[a]), int(arrays.succ[b])
+        return [(pa, b), (a, sb)], [(pa, a), (b, sb)]
+
+    def moved(self, graph_manager, a, b):
+        if graph_manager.node_positions[a] > graph_manager.node_positions[b]:
+            a, b = b, a
+        cycle = graph_manager.node_routes[a]
+        # the reversed part
+        return [(node, cycle, cycle)
+                for node in segment_ids(graph_manager, a, b)]
+
+
+class OrOpt(Move):
+    """
+    Move the segment of up to length customers starting at a right after
+    b, in the same route (intra-route or-opt).
+    """
+    name = 'or_opt'
+    symmetric = False
+
+    def __init__(self, length=3) -> None:
+        self.length = length
+
+    def evaluate(self, graph_manager, a, b):
+        arrays = graph_manager.route_arrays()
+        d = graph_manager.distance_matrix.matrix
+        e = segment_end(arrays, a, self.length)
+        pa, ne, sb = arrays.pred[a], arrays.succ[e], arrays.succ[b]
+        deltas = (d[pa, ne] - d[pa, a] - d[e, ne]
+                  + d[b, a] + d[e, sb] - d[b, sb])
+        position = arrays.positions[b]
+        outside = ((position < arrays.positions[a] - 1)
+                   | (position > arrays.positions[e]))
+        feasible = (arrays.route_keys[a] == arrays.route_keys[b]) & outside
+        return deltas, feasible
+
+    def rebuild(self, graph_manager, a, b):
+        cycle = graph_manager.node_routes[a]
+        e = int(segment_end(graph_manager.route_arrays(), a, self.length))
+        start = graph_manager.node_positions[a]
+        end = graph_manager.node_positions[e]
+        nodes = cycle.to_list()
+        segment = nodes[start:end + 1]
+        rest = nodes[:start] + nodes[end + 1:]
+        index = rest.index(graph_manager.node_list[b]) + 1
+        return [(cycle, rest[:index] + segment + rest[index:])]
+
+    def edges(self, graph_manager, a, b):
+        arrays = graph_manager.route_arrays()
+        e = int(segment_end(arrays, a, self.length))
+        pa, ne, sb = int(arrays.pred[a]), int(arrays.succ[e]), int(arrays.succ[b])
+        return ([(pa, ne), (b, a), (e, sb)],
+                [(pa, a), (e, ne), (b, sb)])
+
+    def moved(self, graph_manager, a, b):
+        e = int(segment_end(graph_manager.route_arrays(), a, self.length))
+        cycle = graph_manager.node_routes[a]
+        return [(node, cycle, cycle)
+                for node in segment_ids(graph_manager, a, e)]
+
+
+class Relocate(Move):
+    """
+    Move customer a right after customer b of another route (inter-route
+    relocate). A route left without customers is dropped.
+    """
+    name = 'relocate'
+    symmetric = False
+
+    def evaluate(self, graph_manager, a, b):
+        arrays = graph_manager.route_arrays()
+        d = graph_manager.distance_matrix.matrix
+        pa, sa, sb = arrays.pred[a], arrays.succ[a], arrays.succ[b]
+        # the route of a disappears when a is its only customer
+        alone = arrays.is_depots[pa] & arrays.is_depots[sa]
+        deltas = (np.where(alone, 0, d[pa, sa]) - d[pa, a] - d[a, sa]
+                  + d[b, a] + d[a, sb] - d[b, sb])
+        feasible = ((arrays.route_keys[a] != arrays.route_keys[b])
+                    & (arrays.loads[b] + arrays.weights[a]
+                       <= graph_manager.max_cap))
+        return deltas, feasible
+
+    def rebuild(self, graph_manager, a, b):
+        node_list = graph_manager.node_list
+        cycle1, cycle2 = graph_manager.node_routes[a], graph_manager.node_routes[b]
+        nodes1 = [node for node in cycle1 if node.id != a or node.is_depot]
+        nodes2 = cycle2.to_list()
+        index = graph_manager.node_positions[b] + 1
+        nodes2 = nodes2[:index] + [node_list[a]] + nodes2[index:]
+        return [(cycle1, nodes1), (cycle2, nodes2)]
+
+    def edges(self, graph_manager, a, b):
+        arrays = graph_manager.route_arrays()
+        pa, sa, sb = int(arrays.pred[a]), int(arrays.succ[a]), int(arrays.succ[b])
+        return ([(pa, sa), (b, a), (a, sb)],
+                [(pa, a), (a, sa), (b, sb)])
+
+    def moved(self, graph_manager, a, b):
+        return [(a, graph_manager.node_routes[a], graph_manager.node_routes[b])]
+
+
+class TwoOptStar(Move):
+    """
+    Exchange the ends of two routes: the route of a continues after a
+    with the customers after b and the other way round (inter-route 2-opt*).
+    Only customers are exchanged, each route still ends at the depot it
+    starts from.
+    """
+    name = 'two_opt_star'
+
+    def evaluate(self, graph_manager, a, b):
+        arrays = graph_manager.route_arrays()
+        d = graph_manager.distance_matrix.matrix
+        sa, sb = arrays.succ[a], arrays.succ[b]
+        la, lb = arrays.lasts[a], arrays.lasts[b]
+        da, db = arrays.succ[la], arrays.succ[lb]
+        # a or b is the last customer when its end is empty
+        end_a, end_b = la == a, lb == b
+        added = (np.where(end_b, d[a, da], d[a, sb] + d[lb, da])
+                 + np.where(end_a, d[b, db], d[b, sa] + d[la, db]))
+        removed = (np.where(end_a, d[a, da], d[a, sa] + d[la, da])
+                   + np.where(end_b, d[b, db], d[b, sb] + d[lb, db]))
+        deltas = added - removed
+        # loads of the route starts up to a and b and of the ends after them
+        head_a, head_b = arrays.prefix[a], arrays.prefix[b]
+        tail_a, tail_b = arrays.loads[a] - head_a, arrays.loads[b] - head_b
+        feasible = ((arrays.route_keys[a] != arrays.route_keys[b])
+                    & (head_a + tail_b <= graph_manager.max_cap)
+                    & (head_b + tail_a <= graph_manager.max_cap))
+        return deltas, feasible
+
+    def rebuild(self, graph_manager, a, b):
+        cycle1, cycle2 = graph_manager.node_routes[a], graph_manager.node_routes[b]
+        i, j = graph_manager.node_positions[a], graph_manager.node_positions[b]
+        nodes1, nodes2 = cycle1.to_list(), cycle2.to_list()
+        return [(cycle1, nodes1[:i + 1] + nodes2[j + 1:-1] + nodes1[-1:]),
+                (cycle2, nodes2[:j + 1] + nodes1[i + 1:-1] + nodes2[-1:])]
+
+    def edges(self, graph_manager, a, b):
+        arrays = graph_manager.route_arrays()
+        sa, sb = int(arrays.succ[a]), int(arrays.succ[b])
+        la, lb = int(arrays.lasts[a]), int(arrays.lasts[b])
+        da, db = int(arrays.succ[la]), int(arrays.succ[lb])
+        added = (([(a, da)] if lb == b else [(a, sb), (lb, da)])
+                 + ([(b, db)] if la == a else [(b, sa), (la, db)]))
+        removed = (([(a, sa)] if la == a else [(a, sa), (la, da)])
+                   + ([(b, sb)] if lb == b else [(b, sb), (lb, db)]))
+        return added, removed
+
+    def moved(self, graph_manager, a, b):
+        cycle1, cycle2 = graph_manager.node_routes[a], graph_manager.node_routes[b]
+        i, j = graph_manager.node_positions[a], graph_manager.node_positions[b]
+        # the customer ends after a and b change routes
+        tail1, tail2 = cycle1.to_list()[i + 1:-1], cycle2.to_list()[j + 1:-1]
+        return ([(node.id, cycle1, cycle2) for node in tail1]
+                + [(node.id, cycle2, cycle1) for node in tail2])
+
+
+class CrossExchange(Move):
+    """
+    Exchange the segments of up to length customers starting at a and at
+    b between their routes (inter-route cross-exchange).
+    """
+    name = 'cross_exchange'
+
+    def __init__(self, length=3) -> None:
+        self.length = length
+
+    def evaluate(self, graph_manager, a, b):
+        arrays = graph_manager.route_arrays()
+        d = graph_manager.distance_matrix.matrix
+        ea, eb = segment_end(arrays, a, self.length), segment_end(arrays, b, self.length)
+        pa, pb = arrays.pred[a], arrays.pred[b]
+        na, nb = arrays.succ[ea], arrays.succ[eb]
+        deltas = (d[pa, b] + d[eb, na] + d[pb, a] + d[ea, nb]
+                  - d[pa, a] - d[ea, na] - d[pb, b] - d[eb, nb])
+        load_a, load_b = segment_load(arrays, a, ea), segment_load(arrays, b, eb)
+        feasible = ((arrays.route_keys[a] != arrays.route_keys[b])
+                    & (arrays.loads[a] - load_a + load_b <= graph_manager.max_cap)
+                    & (arrays.loads[b] - load_b + load_a <= graph_manager.max_cap))
+        return deltas, feasible
+
+    def rebuild(self, graph_manager, a, b):
+        arrays = graph_manager.route_arrays()
+        ea = int(segment_end(arrays, a, self.length))
+        eb = int(segment_end(arrays, b, self.length))
+        positions = graph_manager.node_positions
+        cycle1, cycle2 = graph_manager.node_routes[a], graph_manager.node_routes[b]
+        nodes1, nodes2 = cycle1.to_list(), cycle2.to_list()
+        i1, j1 = positions[a], positions[ea]
+        i2, j2 = positions[b], positions[eb]
+        return [(cycle1, nodes1[:i1] + nodes2[i2:j2 + 1] + nodes1[j1 + 1:]),
+                (cycle2, nodes2[:i2] + nodes1[i1:j1 + 1] + nodes2[j2 + 1:])]
+
+    def edges(self, graph_manager, a, b):
+        arrays = graph_manager.route_arrays()
+        ea = int(segment_end(arrays, a, self.length))
+        eb = int(segment_end(arrays, b, self.length))
+        pa, pb = int(arrays.pred[a]), int(arrays.pred[b])
+        na, nb = int(arrays.succ[ea]), int(arrays.succ[eb])
+        return ([(pa, b), (eb, na), (pb, a), (ea, nb)],
+                [(pa, a), (ea, na), (pb, b), (eb, nb)])
+
+    def moved(self, graph_manager, a, b):
+        arrays = graph_manager.route_arrays()
+        ea = int(segment_end(arrays, a, self.length))
+        eb = int(segment_end(arrays, b, self.length))
+        cycle1, cycle2 = graph_manager.node_routes[a], graph_manager.node_routes[b]
+        return ([(node, cycle1, cycle2)
+                 for node in segment_ids(graph_manager, a, ea)]
+                + [(node, cycle2, cycle1)
+                   for node in segment_ids(graph_manager, b, eb)])
+
+
+OPERATORS = {
+    'swap': Swap,
+    'two_opt': TwoOpt,
+    'or_opt': OrOpt,
+    'relocate': Relocate,
+    'two_opt_star': TwoOptStar,
+    'cross_exchange': CrossExchange,
+}
+
+
+def create_operators(operators):
+    """
+    Move instances from names (see OPERATORS) or instances.
+    """
+    return [OPERATORS[operator]() if isinstance(operator, str) else operator
+            for operator in operators]
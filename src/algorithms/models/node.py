@@ -1,19 +1,32 @@
 import csv
-import copy
+import os
 from typing import List
 
+import numpy as np
+
 try:
     from src.algorithms.models.iterable import Iterable
+    from src.algorithms.models.distance_matrix import DistanceMatrix
+    from src.algorithms.models.spatial_index import SpatialIndex
+    from src.utils.haversine import haversine_matrix
 except:
     from iterable import Iterable
+    from distance_matrix import DistanceMatrix
+    from spatial_index import SpatialIndex
+    from haversine import haversine_matrix
 
 class Node:
+    # no per-node __dict__, nodes of large instances take much less memory
+    __slots__ = ('name', 'lat', 'lon', 'weight', 'is_depot', 'id', 'next',
+                 'prev')
+
     def __init__(self, 
                  name: str, 
                  lat: float, 
                  lon: float, 
                  weight: int, 
-                 is_depot: bool) -> None:
+                 is_depot: bool,
+                 id: int = None) -> None:
         """
         A simple Node. Graph representation of a city.
 
@@ -23,15 +36,28 @@ class Node:
             lon     : The longitude of the city.
             weight  : The order quantity associated with the city.
             is_depot: Flag indicating whether the city is a depot.
+            id      : Index of the city in its NodeList, used to look up
+                      distances in a DistanceMatrix. Nodes are compared
+                      and hashed by id on hot paths, never by name.
         """
         self.name = name
         self.lat = lat
         self.lon = lon
         self.weight = weight
         self.is_depot = is_depot
+        self.id = id
         self.next = None
         self.prev = None
 
+    def terminal(self):
+        """
+        Unlinked copy of a depot, used as the start or the end of a route,
+        so one depot can close many linked routes. Much cheaper than
+        copy.deepcopy, which also copied the linked neighbours.
+        """
+        return Node(self.name, self.lat, self.lon, self.weight, self.is_depot,
+                    self.id)
+
     def __repr__(self):
         is_depot = '-Depot' if self.is_depot else '' 
         return f'<Node{is_depot} {self.name}, w: {self.weight}>'
@@ -42,41 +68,303 @@ class Node:
 
 
 class NodeList(Iterable):
+    # columns of order files, see `from_flie`
+    COLUMNS = ('city', 'order', 'latitude', 'longitude', 'is_depot')
+
     def __init__(self, items: List[Node]) -> None:
-        self._items = items
+        """
+        Nodes of a problem, stored as columns: names, lats, lons, weights
+        and is_depots, where index i is the node with id i.
+
+        Args:
+            items : Nodes of the list, their ids are set to their indexes.
+                    Lists loaded with `from_arrays` (or from files) create
+                    Node objects only when they are first needed.
+
+        Bulk operations (spatial queries, distance matrices, loading and
+        saving) work on the arrays, Node objects are the views used by
+        routes.
+        """
+        for index, node in enumerate(items):
+            node.id = index
+        self._set_columns([node.name for node in items],
+                          [node.lat for node in items],
+                          [node.lon for node in items],
+                          [node.weight for node in items],
+                          [node.is_depot for node in items])
+        self._nodes = items
+
+    def _set_columns(self, names, lats, lons, weights, is_depots, nodes=None,
+                     distance_matrix=None, distance_cache=None):
+        self.names = list(names)
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.weights = np.asarray(weights, dtype=np.int64)
+        self.is_depots = np.asarray(is_depots, dtype=bool)
+        self._nodes = nodes
+        # name -> id, names are only translated at the boundaries
+        self.ids_by_name = dict(zip(self.names, range(len(self.names))))
+        self._distance_matrix = distance_matrix
+        # optional DistanceCache used to build the distance matrix
+        self.distance_cache = distance_cache
+        # SpatialIndex of all nodes, depots and customers, see `spatial_index`
+        self._spatial_indexes = {}
+        # id of the nearest depot by node id, see `closest_depot_ids`
+        self._closest_depot_ids = None
+
+    @classmethod
+    def from_arrays(cls, names, lats, lons, weights, is_depots):
+        node_list = cls.__new__(cls)
+        node_list._set_columns(names, lats, lons, weights, is_depots)
+        return node_list
+
+    @property
+    def _items(self):
+        if self._nodes is None:
+            self._nodes = [
+                Node(name, lat, lon, weight, is_depot, index)
+                for index, (name, lat, lon, weight, is_depot) in enumerate(zip(
+                    self.names, self.lats.tolist(), self.lons.tolist(),
+                    self.weights.tolist(), self.is_depots.tolist()))
+            ]
+        return self._nodes
+
+    def __len__(self) -> int:
+        return len(self.names)
 
     @classmethod
     def from_flie(cls, file_path):
-        nodes = []
+        """
+        Load an order file: csv (see `data/orders_with_depots.csv`),
+        Parquet or `.npy` with the same columns, or a CVRPLIB `.vrp` file.
+        """
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == '.parquet':
+            return cls.from_parquet(file_path)
+        if extension == '.npy':
+            return cls.from_npy(file_path)
+        if extension == '.vrp':
+            return cls.from_vrp(file_path)
+        return cls.from_csv(file_path)
+
+    @staticmethod
+    def _depot_flags(column):
+        """
+        is_depot column as booleans, from booleans or from the 'True' and
+        'False' strings of order files.
+        """
+        column = np.asarray(column)
+        if column.dtype.kind in 'biuf':
+            return column.astype(bool)
+        return column.astype(str) == 'True'
+
+    @classmethod
+    def from_csv(cls, file_path):
         with open(file_path, mode='r', newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                node = Node(
-                    name=row['city'],
-                    weight=int(row['order']),
-                    lat=float(row['latitude']),
-                    lon=float(row['longitude']), 
-                    is_depot=(True if row['is_depot'] == 'True' else False)
-                )
-                nodes.append(node)
-        return cls(nodes)
-    
+            header = next(csv.reader(f))
+            # numpy parses the rows in bulk, columns are converted at once
+            rows = np.loadtxt(f, delimiter=',', quotechar='"', dtype=object,
+                              ndmin=2)
+        names, orders, lats, lons, is_depots = [
+            rows[:, header.index(name)] for name in cls.COLUMNS]
+        return cls.from_arrays(names.tolist(),
+                               lats.astype(np.float64),
+                               lons.astype(np.float64),
+                               orders.astype(np.int64),
+                               cls._depot_flags(is_depots))
+
+    @classmethod
+    def from_vrp(cls, file_path):
+        """
+        Load the nodes and the distance matrix of a CVRPLIB `.vrp` file, see
+        `src.utils.cvrplib.read_vrp` for its capacity and known optimum.
+        """
+        try:
+            from src.utils.cvrplib import read_vrp
+        except:
+            from utils.cvrplib import read_vrp
+        return read_vrp(file_path).node_list
+
+    @classmethod
+    def from_parquet(cls, file_path):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError('Reading Parquet files requires pyarrow')
+        table = pq.read_table(file_path, columns=list(cls.COLUMNS))
+        return cls.from_arrays(table['city'].to_pylist(),
+                               table['latitude'].to_numpy(),
+                               table['longitude'].to_numpy(),
+                               table['order'].to_numpy(),
+                               cls._depot_flags(
+                                   table['is_depot'].to_pylist()))
+
+    @classmethod
+    def from_npy(cls, file_path):
+        """
+        Load a structured array saved by `to_npy`, memory-mapped.
+        """
+        data = np.load(file_path, mmap_mode='r')
+        return cls.from_arrays(data['city'].tolist(), data['latitude'],
+                               data['longitude'], data['order'],
+                               data['is_depot'])
+
+    def to_npy(self, file_path):
+        """
+        Save the columns as a structured array, which loads without
+        parsing, see `from_npy`.
+        """
+        width = max([len(name) for name in self.names], default=1)
+        data = np.empty(len(self), dtype=[('city', f'U{width}'),
+                                          ('order', np.int64),
+                                          ('latitude', np.float64),
+                                          ('longitude', np.float64),
+                                          ('is_depot', bool)])
+        data['city'] = self.names
+        data['order'] = self.weights
+        data['latitude'] = self.lats
+        data['longitude'] = self.lons
+        data['is_depot'] = self.is_depots
+        np.save(file_path, data)
+
+    def to_csv(self, file_path):
+        """
+        Save the columns as an order file, see `from_csv`.
+        """
+        with open(file_path, mode='w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(self.COLUMNS)
+            writer.writerows(zip(self.names, self.weights.tolist(),
+                                 self.lats.tolist(), self.lons.tolist(),
+                                 self.is_depots.tolist()))
+
+    def add(self, name, lat, lon, weight, is_depot=False):
+        """
+        Append a node (e.g. a new order) with the next free id and return
+        it. A distance matrix which is already built is replaced with one
+        with great-circle distances of the node, spatial indexes are rebuilt
+        on the next query, so copies of the list are not affected.
+        """
+        node_id = len(self)
+        node = Node(name, lat, lon, weight, is_depot, node_id)
+        self._set_columns(self.names + [name],
+                          np.append(self.lats, lat),
+                          np.append(self.lons, lon),
+                          np.append(self.weights, weight),
+                          np.append(self.is_depots, is_depot),
+                          nodes=self._nodes,
+                          distance_matrix=self._distance_matrix,
+                          distance_cache=self.distance_cache)
+        if self._nodes is not None:
+            self._nodes.append(node)
+        if self._distance_matrix is not None:
+            # copies of the list keep the matrix without the node
+            self._distance_matrix = self._distance_matrix.add_node(
+                haversine_matrix([lat], [lon], self.lats, self.lons,
+                                 dtype=self._distance_matrix.matrix.dtype)[0])
+        return node
+
+    def copy(self):
+        """
+        Copy of the list with its own, unlinked nodes, sharing the columns,
+        the distance matrix and the spatial indexes. Cheap to pickle, unlike
+        nodes linked into routes.
+        """
+        node_list = NodeList.from_arrays(self.names, self.lats, self.lons,
+                                         self.weights, self.is_depots)
+        node_list._distance_matrix = self._distance_matrix
+        node_list.distance_cache = self.distance_cache
+        node_list._spatial_indexes = self._spatial_indexes
+        node_list._closest_depot_ids = self._closest_depot_ids
+        return node_list
+
+    def __getstate__(self):
+        # nodes are created again from the columns, linked ones would
+        # pickle recursively
+        state = self.__dict__.copy()
+        state['_nodes'] = None
+        return state
+
     def get_node_by_name(self, node_name):
-        for item in self._items:
-            if item.name == node_name:
-                return item
+        node_id = self.ids_by_name.get(node_name)
+        if node_id is not None:
+            return self._items[node_id]
     
+    def spatial_index(self, depots=None):
+        """
+        SpatialIndex of all nodes, of depots only (depots=True) or of
+        customers only (depots=False). Built on the first request and
+        shared by copies of the list.
+        """
+        if depots not in self._spatial_indexes:
+            ids = np.arange(len(self))
+            if depots is not None:
+                ids = ids[self.is_depots == depots]
+            self._spatial_indexes[depots] = SpatialIndex(
+                self.lats[ids], self.lons[ids], ids)
+        return self._spatial_indexes[depots]
+
+    def nearest(self, node, k=1, depots=None):
+        """
+        The k nearest nodes of node (without the node itself), closest
+        first. See `spatial_index` for depots.
+        """
+        _, ids = self.spatial_index(depots).query(node.lat, node.lon, k=k,
+                                                  exclude=node.id)
+        return [self._items[node_id] for node_id in ids[0]]
+
+    def within(self, node, radius, depots=None):
+        """
+        Nodes within radius kilometers of node (without the node itself),
+        closest first. See `spatial_index` for depots.
+        """
+        _, ids = self.spatial_index(depots).query_radius(node.lat, node.lon,
+                                                         radius)
+        return [self._items[node_id] for node_id in ids if node_id != node.id]
+
+    @property
+    def closest_depot_ids(self):
+        """
+        Id of the nearest depot of every node (a depot is its own nearest
+        depot) by node id, computed in one query on the first request.
+        """
+        if self._closest_depot_ids is None:
+            _, ids = self.spatial_index(depots=True).query(self.lats,
+                                                           self.lons)
+            self._closest_depot_ids = ids[:, 0].tolist()
+        return self._closest_depot_ids
+
+    def closest_depot(self, node):
+        """
+        The nearest depot of node, the depot of the list itself.
+        """
+        return self._items[self.closest_depot_ids[node.id]]
+
     def get_closest_depot(self, node):
-        depots = [node for node in self._items if node.is_depot]
-        depot_node = depots[0]
-        depot = copy.deepcopy(depot_node)
-        depot.next, depot.prev = None, None
-        return depot
+        """
+        A terminal of the nearest depot of node, ready to be linked into
+        a route.
+        """
+        return self.closest_depot(node).terminal()
     
+    @property
+    def distance_matrix(self):
+        if self._distance_matrix is None:
+            self._distance_matrix = DistanceMatrix.from_node_list(
+                self, cache=self.distance_cache)
+        return self._distance_matrix
+
+    @distance_matrix.setter
+    def distance_matrix(self, distance_matrix):
+        self._distance_matrix = distance_matrix
+
+    def distance(self, node1, node2):
+        return self.distance_matrix[node1.id, node2.id]
+
     @property
     def depot(self):
-        depots = [node for node in self._items if node.is_depot]
-        return copy.deepcopy(depots[0])
+        depot_id = np.flatnonzero(self.is_depots)[0]
+        return self._items[depot_id].terminal()
     
     def __str__(self) -> str:
         return ('\n').join([str(item) for item in self._items])
@@ -0,0 +1,144 @@
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    # scipy is in requirements.txt; without it every query falls back to
+    # an O(n) numpy scan
+    cKDTree = None
+
+try:
+    from src.utils.haversine import haversine_matrix
+except:
+    from utils.haversine import haversine_matrix
+
+
+EARTH_RADIUS = 6371  # kilometers
+
+
+def unit_vectors(lats, lons):
+    """
+    Points on the unit sphere. The straight-line (chord) distance between
+    them grows with the great-circle distance, so nearest points in 3D are
+    nearest on the Earth.
+    """
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    return np.column_stack([np.cos(lat) * np.cos(lon),
+                            np.cos(lat) * np.sin(lon),
+                            np.sin(lat)])
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS * np.arcsin(np.clip(chord / 2, 0, 1))
+
+
+def km_to_chord(distance):
+    return 2 * np.sin(min(distance / EARTH_RADIUS, np.pi) / 2)
+
+
+class SpatialIndex:
+    def __init__(self, lats, lons, ids=None, chunk_size=1024) -> None:
+        """
+        Nearest-neighbour and radius queries over points given in degrees,
+        with great-circle distances in kilometers.
+
+        Args:
+            lats, lons : Coordinates of the indexed points.
+            ids        : Ids returned for the points, their positions by
+                         default.
+            chunk_size : Query points scanned at once without scipy.
+
+        With scipy a KD-tree over points on the unit sphere answers queries
+        in logarithmic time. Without it every query scans all points with
+        the vectorized haversine formula, in chunks of query points.
+        """
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.ids = (np.arange(len(self.lats)) if ids is None
+                    else np.asarray(ids, dtype=np.int64))
+        self.chunk_size = chunk_size
+        self.tree = (cKDTree(unit_vectors(self.lats, self.lons))
+                     if cKDTree is not None and len(self.lats) else None)
+
+    @classmethod
+    def from_nodes(cls, nodes):
+        nodes = list(nodes)
+        return cls([node.lat for node in nodes], [node.lon for node in nodes],
+                   [node.id for node in nodes])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def query(self, lats, lons, k=1, exclude=None):
+        """
+        Distances and ids of the k nearest points of every query point,
+        ordered by distance. Rows have fewer columns when the index is
+        smaller than k (or k + 1 with exclude).
+
+        Args:
+            exclude : Id per query point which is skipped in its result,
+                      e.g. the id of the node the query is made for.
+        """
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        extra = 0 if exclude is None else 1
+        found = min(k + extra, len(self))
+        if found == 0:
+            empty = np.empty((len(lats), 0))
+            return empty, empty.astype(np.int64)
+        if self.tree is not None:
+            chords, positions = self.tree.query(unit_vectors(lats, lons),
+                                                k=found)
+            distances = chord_to_km(chords).reshape(len(lats), found)
+            positions = positions.reshape(len(lats), found)
+        else:
+            distances, positions = self._scan(lats, lons, found)
+        ids = self.ids[positions]
+        if exclude is not None:
+            distances, ids = self._exclude(distances, ids, exclude)
+        return distances, ids
+
+    def query_radius(self, lat, lon, radius):
+        """
+        Distances and ids of the points within radius kilometers of a
+        point, ordered by distance.
+        """
+        if self.tree is not None:
+            positions = np.array(self.tree.query_ball_point(
+                unit_vectors([lat], [lon])[0], km_to_chord(radius)),
+                dtype=np.int64)
+            distances = haversine_matrix([lat], [lon], self.lats[positions],
+                                         self.lons[positions])[0]
+        else:
+            distances = haversine_matrix([lat], [lon], self.lats, self.lons)[0]
+            positions = np.flatnonzero(distances <= radius)
+            distances = distances[positions]
+        order = np.argsort(distances, kind='stable')
+        return distances[order], self.ids[positions[order]]
+
+    def _scan(self, lats, lons, k):
+        distances = np.empty((len(lats), k))
+        positions = np.empty((len(lats), k), dtype=np.int64)
+        for start in range(0, len(lats), self.chunk_size):
+            stop = start + self.chunk_size
+            chunk = haversine_matrix(lats[start:stop], lons[start:stop],
+                                     self.lats, self.lons)
+            nearest = np.argpartition(chunk, k - 1, axis=1)[:, :k]
+            chunk = np.take_along_axis(chunk, nearest, axis=1)
+            order = np.argsort(chunk, axis=1, kind='stable')
+            distances[start:stop] = np.take_along_axis(chunk, order, axis=1)
+            positions[start:stop] = np.take_along_axis(nearest, order, axis=1)
+        return distances, positions
+
+    @staticmethod
+    def _exclude(distances, ids, exclude):
+        """
+        Drop the excluded id of every row, rows without it drop their
+        farthest point instead, so all rows keep the same length.
+        """
+        exclude = np.broadcast_to(np.asarray(exclude), (len(ids),))
+        distances = np.where(ids == exclude[:, None], np.inf, distances)
+        order = np.argsort(distances, axis=1, kind='stable')[:, :-1]
+        return (np.take_along_axis(distances, order, axis=1),
+                np.take_along_axis(ids, order, axis=1))
@@ -0,0 +1,63 @@
+from collections import deque
+
+
+class TabuList:
+    def __init__(self, size: int) -> None:
+        """
+        Tabu memory of a fixed size with constant time membership checks.
+
+        Args:
+            size : The number of entries remembered.
+
+        Entries are kept in a ring buffer in insertion order, so the oldest
+        one is evicted in constant time, and counted in a dictionary, so
+        `entry in tabu_list` is a hash lookup instead of a scan. Entries are
+        any hashable move attributes, e.g. node pairs, (node, route) pairs
+        or edges.
+        """
+        self.size = size
+        self._entries = deque()
+        # entry -> how many times it is in self._entries
+        self._counts = {}
+
+    def __contains__(self, entry):
+        return entry in self._counts
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __str__(self) -> str:
+        return str(list(self._entries))
+
+    def append(self, entry):
+        if self.size <= 0:
+            return
+        if len(self._entries) >= self.size:
+            self._evict()
+        self._entries.append(entry)
+        self._counts[entry] = self._counts.get(entry, 0) + 1
+
+    def extend(self, entries):
+        for entry in entries:
+            self.append(entry)
+
+    def is_tabu(self, entries):
+        for entry in entries:
+            if entry in self._counts:
+                return True
+        return False
+
+    def clear(self):
+        self._entries.clear()
+        self._counts.clear()
+
+    def _evict(self):
+        entry = self._entries.popleft()
+        count = self._counts[entry] - 1
+        if count:
+            self._counts[entry] = count
+        else:
+            del self._counts[entry]
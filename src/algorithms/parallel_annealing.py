@@ -0,0 +1,212 @@
+import copy
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    from src.algorithms.models.graph_manager import GraphManager
+    from src.algorithms.models.vehicle import Vehicle
+    from src.algorithms.simulated_annealing import SimulatedAnnealing
+except:
+    from models.graph_manager import GraphManager
+    from models.vehicle import Vehicle
+    from simulated_annealing import SimulatedAnnealing
+
+
+# GraphManager of a worker process, created once by `init_worker`
+_worker_graph_manager = None
+
+
+def problem_of(graph_manager):
+    """
+    Arguments for `init_worker`: the nodes without routes (so they pickle
+    without recursion through linked nodes) and the fleet settings. They
+    are sent once per worker, tasks carry only snapshots; a distance
+    matrix from a DistanceCache is sent as the path of its file, which
+    every worker maps.
+    """
+    return (graph_manager.node_list.copy(), graph_manager.max_cap,
+            graph_manager.vehicles, graph_manager.route_class)
+
+
+def init_worker(node_list, max_cap, vehicles, route_class):
+    global _worker_graph_manager
+    _worker_graph_manager = GraphManager(
+        node_list=node_list, max_cap=max_cap, vehicles=vehicles,
+        distance_matrix=node_list.distance_matrix, route_class=route_class)
+
+
+def run_chain(snapshot, seed, epochs, attempts, temperature, cooling_rate):
+    """
+    Anneal the worker's GraphManager from snapshot. Solutions go in and out
+    as snapshots (tuples of node ids), never as linked nodes.
+    """
+    graph_manager = _worker_graph_manager
+    graph_manager.restore(snapshot)
+    sa = SimulatedAnnealing(graph_manager=graph_manager, epochs=epochs,
+                            attempts=attempts, initial_temp=temperature,
+                            cooling_rate=cooling_rate, seed=seed)
+    start = time.perf_counter()
+    sa.optimize()
+    return {
+        'snapshot': sa.best_solution,
+        'length': float(sa.best_length),
+        'temperature': float(sa.temperature),
+        'attempts': epochs * attempts,
+        'time': time.perf_counter() - start,
+    }
+
+
+class ParallelSimulatedAnnealing():
+    def __init__(self, graph_manager: GraphManager, epochs: int, attempts: int,
+                 initial_temp: float, cooling_rate: float, chains: int = 4,
+                 exchange_interval: int = 5, initial_temps=None, seed=None,
+                 max_workers=None) -> None:
+        """
+        Run independent Simulated Annealing chains in a process pool.
+
+        Args:
+            graph_manager (GraphManager) : Initial solution of every chain.
+            epochs (int)                 : The number of epochs of each chain.
+            attempts (int)               : The number of attempts per epoch.
+            initial_temp (float)         : The initial temperature of chains
+                                           without an entry in initial_temps.
+            cooling_rate (float)         : The rate at which the temperature
+                                           cools down.
+
+        Optional:
+            chains (int)            : Number of chains.
+            exchange_interval (int) : Epochs between exchanges of the best
+                                      solution.
+            initial_temps (list)    : Initial temperature of every chain.
+            seed (int)              : Seed from which chain seeds are drawn.
+            max_workers (int)       : Size of the process pool, one process
+                                      per chain (up to the CPU count) by
+                                      default.
+
+        Chains run in rounds of exchange_interval epochs. After every round
+        all chains continue from the best solution found so far, each with
+        its own temperature and random stream. Workers receive the nodes
+        once, solutions travel as snapshots of node ids.
+        """
+        self.graph_manager = graph_manager
+        self.epochs = epochs
+        self.attempts = attempts
+        self.alpha = cooling_rate
+        self.initial_temps = list(initial_temps or [initial_temp] * chains)
+        self.chains = len(self.initial_temps)
+        self.exchange_interval = exchange_interval
+        self.max_workers = max_workers or min(self.chains, os.cpu_count() or 1)
+        seeds = np.random.SeedSequence(seed).generate_state(self.chains)
+        self.seeds = [int(seed) for seed in seeds]
+        self.current_best = graph_manager
+        self.best_solution = graph_manager.snapshot()
+        self.best_length = float(graph_manager.total_length)
+        self.chain_stats = [
+            {'chain': i, 'initial_temp': temp, 'temperature': temp,
+             'best_length': self.best_length, 'attempts': 0, 'time': 0.0,
+             'improvements': 0}
+            for i, temp in enumerate(self.initial_temps)
+        ]
+        # Initial data for logging
+        self.initial_best = graph_manager
+
+    def optimize(self):
+        snapshots = [self.best_solution] * self.chains
+        with ProcessPoolExecutor(max_workers=self.max_workers,
+                                 initializer=init_worker,
+                                 initargs=problem_of(self.graph_manager)
+                                 ) as executor:
+            epochs_done = 0
+            round_number = 0
+            while epochs_done < self.epochs:
+                epochs = min(self.exchange_interval, self.epochs - epochs_done)
+                futures = [
+                    executor.submit(run_chain, snapshots[i],
+                                    [self.seeds[i], round_number], epochs,
+                                    self.attempts, stats['temperature'],
+                                    self.alpha)
+                    for i, stats in enumerate(self.chain_stats)
+                ]
+                results = [future.result() for future in futures]
+                for stats, result in zip(self.chain_stats, results):
+                    self.update_chain_stats(stats, result)
+                # exchange the best solution between chains
+                best = min(results, key=lambda result: result['length'])
+                if best['length'] < self.best_length:
+                    self.best_solution = best['snapshot']
+                    self.best_length = best['length']
+                snapshots = [self.best_solution] * self.chains
+                epochs_done += epochs
+                round_number += 1
+        self.current_best = self.create_solution(self.best_solution)
+        return self.current_best
+
+    def update_chain_stats(self, stats, result):
+        if result['length'] < stats['best_length']:
+            stats['best_length'] = result['length']
+            stats['improvements'] += 1
+        stats['temperature'] = result['temperature']
+        stats['attempts'] += result['attempts']
+        stats['time'] += result['time']
+        stats['moves_per_second'] = stats['attempts'] / max(stats['time'], 1e-9)
+
+    def create_solution(self, snapshot):
+        solution = copy.deepcopy(self.graph_manager)
+        solution.restore(snapshot)
+        return solution
+
+    def to_fleet(self):
+        fleet = [Vehicle(i+1) for i in range(self.graph_manager.vehicles)]
+
+        cur_veh_idx = 0
+        for cycle in self.current_best.cycles:
+            fleet[cur_veh_idx].add_route(cycle)
+            if cur_veh_idx < self.graph_manager.vehicles-1:
+                cur_veh_idx += 1
+            else:
+                cur_veh_idx = 0
+
+        return fleet
+
+    def __str__(self):
+        num_cities = len(self.graph_manager.node_list)
+        num_depots = len([d for d in self.graph_manager.node_list if d.is_depot])
+        lines = [
+            '------Parallel Simulated Annealing Algorithm-------',
+            f'Chains               : {self.chains}',
+            f'Exchange Interval    : {self.exchange_interval}',
+            f'Cooling Factor       : {self.alpha}',
+            f"Epochs               : {self.epochs}",
+            f"Attempts             : {self.attempts}",
+            f"Fleet size           : {self.graph_manager.vehicles}",
+            f"Vehicle Capacity     : {self.graph_manager.max_cap}",
+            f"Total Locations      : {num_cities}",
+            f"Total Depots         : {num_depots}",
+            f"Initial Shortest     : {self.initial_best.total_length}",
+            f"Current Shortest     : {self.best_length}",
+        ]
+        for stats in self.chain_stats:
+            lines.append(
+                f"Chain {stats['chain']:<3}            : "
+                f"best {stats['best_length']}, "
+                f"{stats.get('moves_per_second', 0):.0f} moves/s")
+        lines.append('---------------------------------------------------')
+        return ('\n').join(lines)
+
+
+if __name__ == "__main__":
+    clm = GraphManager(
+        node_list='./data/orders_with_depots.csv',
+        max_cap=1000,
+        vehicles=5
+    )
+
+    PSA = ParallelSimulatedAnnealing(graph_manager=clm, epochs=35, attempts=35,
+                                     initial_temp=1, cooling_rate=0.9,
+                                     chains=4, initial_temps=[1, 5, 10, 50],
+                                     seed=1)
+    PSA.optimize()
+    print(PSA)
@@ -0,0 +1,207 @@
+import copy
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from math import exp
+
+import numpy as np
+
+try:
+    from src.algorithms.models.graph_manager import GraphManager
+    from src.algorithms.models.vehicle import Vehicle
+    from src.algorithms.simulated_annealing import SimulatedAnnealing
+    from src.algorithms import parallel_annealing
+except:
+    from models.graph_manager import GraphManager
+    from models.vehicle import Vehicle
+    from simulated_annealing import SimulatedAnnealing
+    import parallel_annealing
+
+
+def geometric_ladder(min_temp, max_temp, replicas):
+    """
+    Temperatures from min_temp to max_temp with a constant ratio between
+    neighbours, a common starting point for tuning the ladder.
+    """
+    return [float(temp) for temp in np.geomspace(min_temp, max_temp, replicas)]
+
+
+def run_replica(snapshot, seed, attempts, temperature):
+    """
+    Anneal the worker's GraphManager at a fixed temperature and return the
+    state the chain ended in, together with the best state it visited.
+    """
+    graph_manager = parallel_annealing._worker_graph_manager
+    graph_manager.restore(snapshot)
+    sa = SimulatedAnnealing(graph_manager=graph_manager, epochs=1,
+                            attempts=attempts, initial_temp=temperature,
+                            cooling_rate=1, seed=seed)
+    start = time.perf_counter()
+    sa.run_epoch()
+    return {
+        'snapshot': sa.current_best.snapshot(),
+        'length': float(sa.current_best.total_length),
+        'best_snapshot': sa.best_solution,
+        'best_length': float(sa.best_length),
+        'attempts': attempts,
+        'time': time.perf_counter() - start,
+    }
+
+
+class ReplicaExchange():
+    def __init__(self, graph_manager: GraphManager, temperatures, rounds: int,
+                 attempts: int, seed=None, max_workers=None) -> None:
+        """
+        Parallel tempering: Simulated Annealing replicas at a ladder of fixed
+        temperatures, running concurrently in a process pool.
+
+        Args:
+            graph_manager (GraphManager) : Initial solution of every replica.
+            temperatures (list)          : Temperature of every replica, see
+                                           `geometric_ladder`.
+            rounds (int)                 : Number of exchange rounds.
+            attempts (int)               : Moves tried by each replica
+                                           between exchanges.
+
+        Optional:
+            seed (int)        : Seed of the replicas and of the exchanges.
+            max_workers (int) : Size of the process pool, one process per
+                                replica (up to the CPU count) by default.
+
+        After each round, neighbouring replicas (alternately the even and
+        the odd pairs) swap states with the Metropolis probability
+        min(1, exp((E_i - E_j) * (1/T_i - 1/T_j))). Hot replicas explore,
+        cold ones refine, and good states travel down the ladder instead of
+        freezing in a single cooling chain.
+
+        Throughput metrics are collected in `replica_stats` (moves per
+        second of every temperature) and `swap_stats` (swap acceptance rate
+        of every neighbouring pair).
+        """
+        self.graph_manager = graph_manager
+        self.temperatures = sorted(temperatures)
+        self.rounds = rounds
+        self.attempts = attempts
+        self.max_workers = max_workers or min(len(self.temperatures),
+                                              os.cpu_count() or 1)
+        seed_sequence = np.random.SeedSequence(seed)
+        self.random = np.random.default_rng(seed_sequence.spawn(1)[0])
+        seeds = seed_sequence.generate_state(len(self.temperatures))
+        self.seeds = [int(seed) for seed in seeds]
+        self.current_best = graph_manager
+        self.best_solution = graph_manager.snapshot()
+        self.best_length = float(graph_manager.total_length)
+        self.replica_stats = [
+            {'temperature': temp, 'attempts': 0, 'time': 0.0,
+             'moves_per_second': 0.0, 'best_length': self.best_length}
+            for temp in self.temperatures
+        ]
+        self.swap_stats = [
+            {'temperatures': (self.temperatures[i], self.temperatures[i + 1]),
+             'attempts': 0, 'accepted': 0, 'acceptance_rate': 0.0}
+            for i in range(len(self.temperatures) - 1)
+        ]
+        # Initial data for logging
+        self.initial_best = graph_manager
+
+    def optimize(self):
+        states = [(self.best_solution, self.best_length)] * len(self.temperatures)
+        with ProcessPoolExecutor(max_workers=self.max_workers,
+                                 initializer=parallel_annealing.init_worker,
+                                 initargs=parallel_annealing.problem_of(
+                                     self.graph_manager)
+                                 ) as executor:
+            for round_number in range(self.rounds):
+                futures = [
+                    executor.submit(run_replica, states[i][0],
+                                    [self.seeds[i], round_number],
+                                    self.attempts, temp)
+                    for i, temp in enumerate(self.temperatures)
+                ]
+                results = [future.result() for future in futures]
+                for stats, result in zip(self.replica_stats, results):
+                    self.update_replica_stats(stats, result)
+                states = [(result['snapshot'], result['length'])
+                          for result in results]
+                self.exchange(states, first=round_number % 2)
+        self.current_best = copy.deepcopy(self.graph_manager)
+        self.current_best.restore(self.best_solution)
+        return self.current_best
+
+    def update_replica_stats(self, stats, result):
+        stats['attempts'] += result['attempts']
+        stats['time'] += result['time']
+        stats['moves_per_second'] = stats['attempts'] / max(stats['time'], 1e-9)
+        stats['best_length'] = min(stats['best_length'], result['best_length'])
+        if result['best_length'] < self.best_length:
+            self.best_solution = result['best_snapshot']
+            self.best_length = result['best_length']
+
+    def exchange(self, states, first):
+        """
+        Try to swap the states of neighbouring replicas i and i + 1 for
+        i = first, first + 2, ...
+        """
+        for i in range(first, len(states) - 1, 2):
+            cold, hot = self.temperatures[i], self.temperatures[i + 1]
+            exponent = (states[i][1] - states[i + 1][1]) * (1 / cold - 1 / hot)
+            stats = self.swap_stats[i]
+            stats['attempts'] += 1
+            if exponent >= 0 or self.random.random() < exp(exponent):
+                states[i], states[i + 1] = states[i + 1], states[i]
+                stats['accepted'] += 1
+            stats['acceptance_rate'] = stats['accepted'] / stats['attempts']
+
+    def to_fleet(self):
+        fleet = [Vehicle(i+1) for i in range(self.graph_manager.vehicles)]
+
+        cur_veh_idx = 0
+        for cycle in self.current_best.cycles:
+            fleet[cur_veh_idx].add_route(cycle)
+            if cur_veh_idx < self.graph_manager.vehicles-1:
+                cur_veh_idx += 1
+            else:
+                cur_veh_idx = 0
+
+        return fleet
+
+    def __str__(self):
+        num_cities = len(self.graph_manager.node_list)
+        num_depots = len([d for d in self.graph_manager.node_list if d.is_depot])
+        lines = [
+            '-------------Replica Exchange Algorithm------------',
+            f"Replicas             : {len(self.temperatures)}",
+            f"Rounds               : {self.rounds}",
+            f"Attempts             : {self.attempts}",
+            f"Fleet size           : {self.graph_manager.vehicles}",
+            f"Vehicle Capacity     : {self.graph_manager.max_cap}",
+            f"Total Locations      : {num_cities}",
+            f"Total Depots         : {num_depots}",
+            f"Initial Shortest     : {self.initial_best.total_length}",
+            f"Current Shortest     : {self.best_length}",
+        ]
+        for stats in self.replica_stats:
+            label = f"T = {stats['temperature']:.4g}"
+            lines.append(f"{label:<21}: "
+                         f"{stats['moves_per_second']:.0f} moves/s, "
+                         f"best {stats['best_length']}")
+        for stats in self.swap_stats:
+            label = 'Swap {:.4g} <-> {:.4g}'.format(*stats['temperatures'])
+            lines.append(f"{label:<21}: "
+                         f"{stats['acceptance_rate']:.0%} accepted")
+        lines.append('---------------------------------------------------')
+        return ('\n').join(lines)
+
+
+if __name__ == "__main__":
+    clm = GraphManager(
+        node_list='./data/orders_with_depots.csv',
+        max_cap=1000,
+        vehicles=5
+    )
+
+    RE = ReplicaExchange(graph_manager=clm,
+                         temperatures=geometric_ladder(1, 200, 6),
+                         rounds=40, attempts=50, seed=1)
+    RE.optimize()
+    print(RE)
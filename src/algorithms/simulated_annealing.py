@@ -1,62 +1,144 @@
-import random
 import copy
+import itertools
 from math import exp
 from typing import List
 
+import numpy as np
+
 try:
+    from src.algorithms.cooling import create_schedule, initial_temperature
+    from src.algorithms.instrumentation import Instrumentation
     from src.algorithms.models.graph_manager import GraphManager
+    from src.algorithms.models.moves import create_operators
+    from src.algorithms.models.spatial_index import SpatialIndex
     from src.algorithms.models.vehicle import Vehicle
+    from src.algorithms.stopping import Improvement, StoppingCriteria
 except:
+    from cooling import create_schedule, initial_temperature
+    from instrumentation import Instrumentation
     from models.graph_manager import GraphManager
+    from models.moves import create_operators
+    from models.spatial_index import SpatialIndex
     from models.vehicle import Vehicle
+    from stopping import Improvement, StoppingCriteria
 
 
 
 class SimulatedAnnealing():
     def __init__(self, graph_manager: GraphManager, epochs: int, attempts: int, 
                  initial_temp: float, cooling_rate: float,
-                 store_solutions: bool=False
-                 ) -> None:
+                 store_solutions: bool=False, seed=None,
+                 neighbours: int = None, focus=None,
+                 operators=('swap',),
+                 instrumentation: Instrumentation = None,
+                 time_limit: float = None, target: float = None,
+                 patience: int = None, schedule='geometric',
+                 initial_acceptance: float = 0.1) -> None:
         """
         Initialize a Simulated Annealing algorithm instance for the vehicle
         routing problem.
 
         Args:
-            graph_manager (GraphManager) : The fleet of vehicles to be used 
-                                           in the routing problem. 
+            graph_manager (GraphManager) : The initial solution, routes of
+                                           the fleet which are improved on
+                                           a copy.
             epochs (int)                 : The number of epochs (iterations) 
-                                           to run the algorithm.
+                                           to run the algorithm, None to run
+                                           until a stopping criterion.
             attempts (int)               : The number of attempts per epoch to 
                                            find a better solution.
             initial_temp (float)         : The initial temperature for 
-                                           the annealing process.
+                                           the annealing process, 'auto' to
+                                           calibrate it from a sample of
+                                           moves.
             cooling_rate (float)         : The rate at which the temperature 
                                            cools down.
 
         Optional:
             store_solutions (bool): Save individual solutions.
+            seed (int | Generator): Seed or NumPy Generator of the random
+                                    choices, the generator of graph_manager
+                                    by default.
+            neighbours (int)      : Swap nodes only with one of their
+                                    nearest neighbours, any two nodes are
+                                    swapped by default.
+            focus (list)          : Nodes which changed, e.g. new orders.
+                                    Moves then start from them or their
+                                    nearest customers only, a quick local
+                                    reoptimization of a warm solution.
+            operators (list)      : Move operators, names or Move
+                                    instances (see
+                                    `models.moves.OPERATORS`), every
+                                    attempt uses one of them at random.
+            instrumentation       : Instrumentation collecting phase
+                                    timings, move counters and 'epoch'
+                                    events, off by default.
+            time_limit (float)    : Stop after this many seconds, checked
+                                    every 256 attempts.
+            target (float)        : Stop once the best length is at or
+                                    below the target.
+            patience (int)        : Stop after this many epochs in a row
+                                    without a new best solution.
+            schedule              : Cooling schedule, a name or Schedule
+                                    instance (see `cooling.SCHEDULES`),
+                                    geometric by default.
+            initial_acceptance    : Probability of accepting a median
+                                    worsening move at the initial
+                                    temperature, when it is 'auto'.
             
         The algorithm explores solutions at each temperature level, making a 
         series of attempts. In each attempt, it probabilistically decides 
         whether to accept a new solution based on its quality and the current 
         temperature. The current best solution is updated whenever a better 
         solution is found. At the end of each epoch, the temperature is reduced 
-        according to the cooling rate. This process allows the algorithm to 
+        according to the cooling schedule. This process allows the algorithm to 
         potentially accept worse solutions at higher temperatures, providing a 
         mechanism to escape local optima. As the temperature decreases, the 
         algorithm becomes increasingly likely to accept only better solutions, 
         converging towards a global optimum.
         """
         self.graph_manager = graph_manager
-        self.temperature = initial_temp
         self.epochs = epochs
         self.attempts = attempts
         self.alpha = cooling_rate
         self.store_solutions = store_solutions
         self.solutions_storage = []
-        self.current_best = graph_manager
+        self.instrumentation = instrumentation
+        if instrumentation is not None:
+            instrumentation.labels.setdefault('optimizer',
+                                              'simulated_annealing')
+            instrumentation.lap()
+        # working solution, moves are applied to it in place and undone
+        # when rejected
+        self.current_best = copy.deepcopy(graph_manager)
+        # best solution seen so far, stored as a snapshot of the routes
+        self.best_solution = self.current_best.snapshot()
+        self.best_length = self.current_best.total_length
+        if instrumentation is not None:
+            instrumentation.lap('copy')
+        self.random = (np.random.default_rng(seed) if seed is not None
+                       else graph_manager.random)
+        self.customers = self.current_best.customers
+        self.focus = (self.focus_positions(focus) if focus is not None
+                      else None)
+        self.neighbours = neighbours
+        self.neighbour_table = (self.create_neighbour_table(neighbours)
+                                if neighbours else None)
+        self.operators = create_operators(operators)
+        if initial_temp == 'auto':
+            initial_temp = self.calibrate_temperature(
+                acceptance=initial_acceptance)
+        self.temperature = initial_temp
+        self.schedule = create_schedule(schedule, cooling_rate)
+        # accepted among the feasible moves of the last epoch
+        self.acceptance_ratio = None
+        self.stopping = StoppingCriteria(time_limit, target, patience)
+        if epochs is None and not self.stopping.bounded:
+            raise ValueError('epochs=None needs time_limit, target or patience')
+        # name of the stopping criterion which ended the run, if any
+        self.stopped_by = None
         # Initial data for logging
-        self.initial_best = self.current_best
+        self.initial_best = graph_manager
         self.initial_temp = initial_temp
 
     @property
@@ -64,47 +146,229 @@ class SimulatedAnnealing():
         return self.current_best.total_length
 
     def optimize(self):
-        for _ in range(self.epochs):
-            self.run_epoch()
-            self.temperature = round(self.temperature * self.alpha, 2)
+        for _ in self.iterate():
+            pass
+        if self.instrumentation is not None:
+            self.instrumentation.lap()
+        self.current_best.restore(self.best_solution)
+        if self.instrumentation is not None:
+            self.instrumentation.lap('copy')
         return self.current_best
 
+    def iterate(self):
+        """
+        Anytime run: yields an Improvement (length, snapshot, elapsed
+        seconds) after every epoch which found a new best solution, until
+        the last epoch or a stopping criterion. A caller may stop early and
+        `restore` the last snapshot; `optimize` runs it to the end.
+        """
+        self.stopping.start()
+        self.schedule.start(self.temperature)
+        self.stopped_by = None
+        epochs = (range(self.epochs) if self.epochs is not None
+                  else itertools.count())
+        for epoch in epochs:
+            best_length = self.best_length
+            self.run_epoch()
+            if self.instrumentation is not None:
+                self.instrumentation.emit(
+                    'epoch', epoch=epoch, temperature=self.temperature,
+                    length=float(self.current_best.total_length),
+                    best_length=float(self.best_length))
+            improved = self.best_length < best_length
+            self.temperature = self.schedule.next(
+                self.temperature, self.acceptance_ratio, improved)
+            self.stopping.update(improved)
+            if improved:
+                yield Improvement(self.best_length, self.best_solution,
+                                  self.stopping.elapsed())
+            self.stopped_by = self.stopping.check(self.best_length)
+            if self.stopped_by:
+                break
+
+    def calibrate_temperature(self, size=None, acceptance=0.1):
+        """
+        Initial temperature from the length changes of a sample of random
+        moves (attempts of one epoch, at least 100), which are evaluated
+        but not made, see `cooling.initial_temperature`.
+        """
+        size = size or max(self.attempts, 100)
+        ids = np.array([node.id for node in self.customers], dtype=np.int64)
+        pairs = ids[np.array(self.draw_pairs(size), dtype=np.int64)]
+        operators = self.random.integers(len(self.operators), size=size)
+        deltas = []
+        for index, operator in enumerate(self.operators):
+            first, second = pairs[operators == index].T
+            if len(first):
+                delta, feasible = operator.evaluate(self.current_best, first,
+                                                    second)
+                deltas.append(np.asarray(delta)[np.asarray(feasible)])
+        return initial_temperature(np.concatenate(deltas) if deltas else [],
+                                   acceptance)
+
+    def create_neighbour_table(self, k):
+        """
+        Positions in self.customers of the k nearest customers of every
+        customer, looked up in the spatial index of the node list.
+        """
+        ids = np.array([node.id for node in self.customers], dtype=np.int64)
+        index = self.current_best.node_list.spatial_index(depots=False)
+        if len(index) != len(ids):
+            # some customers were removed from the solution
+            index = SpatialIndex.from_nodes(self.customers)
+        _, nearest = index.query([node.lat for node in self.customers],
+                                 [node.lon for node in self.customers],
+                                 k=k, exclude=ids)
+        # customers are ordered by id
+        return np.searchsorted(ids, nearest)
+
+    def focus_positions(self, nodes):
+        """
+        Positions in self.customers of the neighbourhood of nodes.
+        """
+        ids = np.array([node.id for node in self.customers], dtype=np.int64)
+        return np.searchsorted(ids, self.current_best.neighbourhood(nodes))
+
+    def draw_pairs(self, size):
+        if self.focus is not None:
+            first = self.focus[self.random.integers(len(self.focus),
+                                                    size=size)]
+        elif self.neighbour_table is None:
+            return self.random.integers(len(self.customers),
+                                        size=(size, 2)).tolist()
+        else:
+            first = self.random.integers(len(self.customers), size=size)
+        if self.neighbour_table is None:
+            second = self.random.integers(len(self.customers), size=size)
+            return np.column_stack([first, second]).tolist()
+        columns = self.random.integers(self.neighbour_table.shape[1],
+                                       size=size)
+        second = self.neighbour_table[first, columns]
+        return np.column_stack([first, second]).tolist()
 
     def run_epoch(self):
-        for _ in range(self.attempts):
-            new_solution = self.anneal()
-            if new_solution.total_length <= self.current_best_solution:
-                self.current_best = new_solution
-            elif self.accept_worse_solution(new_solution):
-                self.current_best = new_solution
+        record = self.instrumentation
+        if record is not None:
+            record.lap()
+        # random numbers of the whole epoch are drawn at once
+        pairs = self.draw_pairs(self.attempts)
+        thresholds = self.random.random(self.attempts).tolist()
+        operators = self.random.integers(len(self.operators),
+                                         size=self.attempts).tolist()
+        if record is not None:
+            record.lap('selection')
+        deadline = self.stopping.deadline
+        accepted = feasible = 0
+        for attempt, ((index1, index2), threshold, operator) in enumerate(
+                zip(pairs, thresholds, operators)):
+            if (deadline is not None and not attempt % 256
+                    and self.stopping.out_of_time()):
+                break
+            node1, node2 = self.customers[index1], self.customers[index2]
+            operator = self.operators[operator]
+            if operator.name == 'swap':
+                outcome = self.try_swap(node1, node2, threshold, record)
             else:
-                pass
+                outcome = self.try_move(operator, node1, node2, threshold,
+                                        record)
+            if outcome != 'infeasible':
+                feasible += 1
+                accepted += outcome == 'accepted'
             if self.store_solutions:
-                self.solutions_storage.append(self.current_best)
+                self.solutions_storage.append(self.current_best.snapshot())
+            if record is not None:
+                if self.store_solutions:
+                    record.lap('copy')
+                record.count('moves_tried')
+                record.count(f'moves_{outcome}')
+        self.acceptance_ratio = accepted / feasible if feasible else 0.0
+
+    def try_swap(self, node1, node2, threshold=None, record=None):
+        """
+        Swap two nodes in place and take the swap back when it is rejected.
+        Returns 'accepted', 'rejected' or 'infeasible'.
+        """
+        solution = self.current_best
+        routes = len(solution.cycles)
+        delta = self.anneal(node1, node2)
+        if record is not None:
+            record.lap('apply')
+            if len(solution.cycles) > routes:
+                record.count('routes_created', len(solution.cycles) - routes)
+        if solution._last_move is None:
+            # handle_swap made no change
+            return 'infeasible'
+        if delta <= 0:
+            self.update_best_solution()
+            if record is not None:
+                record.lap('copy')
+            return 'accepted'
+        accepted = self.accept_worse_solution(delta, threshold)
+        if record is not None:
+            record.lap('acceptance')
+        if accepted:
+            return 'accepted'
+        solution.undo()
+        if record is not None:
+            record.lap('apply')
+        return 'rejected'
+
+    def try_move(self, operator, node1, node2, threshold=None, record=None):
+        """
+        Evaluate a move first and apply it only when it is feasible and
+        accepted, so rejected moves cost no route changes. Returns
+        'accepted', 'rejected' or 'infeasible'.
+        """
+        solution = self.current_best
+        delta, feasible = operator.evaluate(solution, node1.id, node2.id)
+        if record is not None:
+            record.lap('evaluation')
+        if not feasible:
+            return 'infeasible'
+        accepted = delta <= 0 or self.accept_worse_solution(delta, threshold)
+        if record is not None:
+            record.lap('acceptance')
+        if not accepted:
+            return 'rejected'
+        operator.apply(solution, node1.id, node2.id)
+        if record is not None:
+            record.lap('apply')
+        if delta <= 0:
+            self.update_best_solution()
+            if record is not None:
+                record.lap('copy')
+        return 'accepted'
+
+    def update_best_solution(self):
+        if self.current_best.total_length < self.best_length:
+            self.best_solution = self.current_best.snapshot()
+            self.best_length = self.current_best.total_length
 
-    def accept_worse_solution(self, new_solution):
-        new_distance = new_solution.total_length
-        current_distance = self.current_best_solution
-        exponent = -abs((new_distance - current_distance) / self.temperature)
+    def accept_worse_solution(self, delta, threshold=None):
+        if self.temperature <= 0:
+            # frozen, only improving moves are accepted
+            return False
+        exponent = -abs(float(delta) / self.temperature)
         probability = exp(exponent)
-        treshold = random.uniform(0, 1)
-        return probability > treshold
+        if threshold is None:
+            threshold = self.random.random()
+        return probability > threshold
         
-    def anneal(self):
-        # copy current best solution
-        solution = copy.deepcopy(self.current_best)
+    def anneal(self, node1=None, node2=None):
+        solution = self.current_best
         # find 2 random nodes to swap
-        random_node1 = self.select_random_city(solution.node_list)
-        random_node2 = self.select_random_city(solution.node_list)
-        # handle swap
-        solution.handle_swap(random_node1, random_node2)
-
-        return solution
+        if node1 is None:
+            node1 = self.select_random_city(solution.node_list)
+        if node2 is None:
+            node2 = self.select_random_city(solution.node_list)
+        # handle swap in place, the length change comes from the touched
+        # edges only
+        return solution.handle_swap(node1, node2)
     
     def select_random_city(self, graph):
         choices = [node for node in graph if not node.is_depot]
         if choices:
-            return random.choice(choices)
+            return choices[self.random.integers(len(choices))]
     
     def to_fleet(self):
         fleet = [Vehicle(i+1) for i in range(self.graph_manager.vehicles)]
@@ -127,6 +391,7 @@ class SimulatedAnnealing():
             f'Current Temperature  : {self.temperature}',
             f'Initial Temperature  : {self.initial_temp}',
             f'Cooling Factor       : {self.alpha}',
+            f'Cooling Schedule     : {self.schedule.name}',
             f"Epochs               : {self.epochs}",
             f"Attempts             : {self.attempts}",
             f"Fleet size           : {self.graph_manager.vehicles}",
@@ -135,6 +400,7 @@ class SimulatedAnnealing():
             f"Total Depots         : {num_depots}",
             f"Initial Shortest     : {self.initial_best.total_length}",
             f"Current Shortest     : {self.current_best_solution}",
+            f"Stopped By           : {self.stopped_by}",
             '---------------------------------------------------',
         ])
 
@@ -0,0 +1,67 @@
+from collections import namedtuple
+from time import perf_counter
+
+
+# new best solution yielded by the anytime `iterate` of the optimizers
+Improvement = namedtuple('Improvement', ['length', 'snapshot', 'elapsed'])
+
+
+class StoppingCriteria:
+    def __init__(self, time_limit=None, target=None, patience=None,
+                 clock=perf_counter) -> None:
+        """
+        When an optimizer stops before its last epoch or iteration.
+
+        Args:
+            time_limit : Seconds of wall-clock time from `start`.
+            target     : Length at or below which the solution is good
+                         enough.
+            patience   : Number of epochs (iterations) in a row without
+                         a new best solution.
+            clock      : Time source in seconds.
+
+        `check` costs a comparison and, with a time limit, one clock read,
+        so optimizers call it after every epoch or iteration, and
+        `out_of_time` also inside long epochs.
+        """
+        self.time_limit = time_limit
+        self.target = target
+        self.patience = patience
+        self.clock = clock
+        self.started = None
+        self.deadline = None
+        # epochs or iterations since the last new best solution
+        self.stale = 0
+
+    @property
+    def bounded(self):
+        return (self.time_limit is not None or self.target is not None
+                or self.patience is not None)
+
+    def start(self):
+        self.started = self.clock()
+        self.deadline = (self.started + self.time_limit
+                         if self.time_limit is not None else None)
+        self.stale = 0
+
+    def elapsed(self):
+        return self.clock() - self.started
+
+    def update(self, improved):
+        self.stale = 0 if improved else self.stale + 1
+
+    def out_of_time(self):
+        return self.deadline is not None and self.clock() >= self.deadline
+
+    def check(self, best_length):
+        """
+        Name of the criterion which is met ('target', 'patience' or
+        'time_limit'), None to go on.
+        """
+        if self.target is not None and best_length <= self.target:
+            return 'target'
+        if self.patience is not None and self.stale >= self.patience:
+            return 'patience'
+        if self.out_of_time():
+            return 'time_limit'
+        return None
@@ -1,83 +1,288 @@
-import random
 import copy
+import itertools
+import warnings
 from math import exp
 from typing import List
 
+import numpy as np
+
 try:
+    from src.algorithms.instrumentation import Instrumentation
     from src.algorithms.models.graph_manager import GraphManager
+    from src.algorithms.models.moves import create_operators
+    from src.algorithms.models.tabu_list import TabuList
     from src.algorithms.models.vehicle import Vehicle
+    from src.algorithms.stopping import Improvement, StoppingCriteria
 except:
+    from instrumentation import Instrumentation
     from models.graph_manager import GraphManager
+    from models.moves import create_operators
+    from models.tabu_list import TabuList
     from models.vehicle import Vehicle
+    from stopping import Improvement, StoppingCriteria
 
 
 
 class TabuSearch():
     def __init__(self, graph_manager: GraphManager, max_iterations: int,
-                 tabu_size: int, search_limit_level: float = 0.8) -> None:
+                 tabu_size: int, search_limit_level: float = None,
+                 seed=None, tabu_attribute: str = 'move',
+                 aspiration: bool = True, candidates: int = 10,
+                 focus=None, operators=('swap',),
+                 instrumentation: Instrumentation = None,
+                 time_limit: float = None, target: float = None,
+                 patience: int = None) -> None:
         """
-        Initialize a Tabu Searcg algorithm instance for the vehicle
+        Initialize a Tabu Search algorithm instance for the vehicle
         routing problem.
 
         Args:
-            graph_manager (GraphManager) : The fleet of vehicles to be used 
-                                           in the routing problem. 
+            graph_manager (GraphManager) : The initial solution, routes of
+                                           the fleet which are improved on
+                                           a copy.
             max_iterations (int)         : The number of iterations to run by 
-                                           the algorithm.
-            tabu_size (int)              : The size of the tabu list.
+                                           the algorithm, None to run until
+                                           a stopping criterion.
+            tabu_size (int)              : The number of move attributes
+                                           remembered by the tabu list.
         Optional:
-            search_limit_level (float)   : A part of max_iterations from which 
-                                           the algorithm will lessen the 
-                                           search area.
-                
+            search_limit_level (float)   : Deprecated and ignored, the whole
+                                           candidate neighbourhood is
+                                           evaluated.
+            seed (int | Generator)       : Seed or NumPy Generator of the
+                                           random choices, the generator of
+                                           graph_manager by default.
+            tabu_attribute (str)         : What the tabu list remembers:
+                                           'move' - swapped pairs of nodes,
+                                           'node_route' - routes nodes were
+                                           moved out of (or moved in), see
+                                           `Move.moved`, 'edge' - removed
+                                           edges.
+            aspiration (bool)            : Allow tabu moves which lead to
+                                           a new best solution.
+            candidates (int)             : Size of the candidate list of
+                                           every node, only swaps with its
+                                           nearest neighbours are evaluated.
+            focus (list)                 : Nodes which changed, e.g. new
+                                           orders. Only swaps of them and
+                                           their nearest customers are
+                                           evaluated, a quick local
+                                           reoptimization of a warm
+                                           solution.
+            operators (list)             : Move operators making up the
+                                           neighbourhood, names or Move
+                                           instances, see
+                                           `models.moves.OPERATORS`.
+            instrumentation              : Instrumentation collecting
+                                           phase timings, move counters
+                                           and 'iteration' events, off by
+                                           default.
+            time_limit (float)           : Stop after this many seconds.
+            target (float)               : Stop once the best length is at
+                                           or below the target.
+            patience (int)               : Stop after this many iterations
+                                           in a row without a new best
+                                           solution.
+
         The algorithm iteratively explores the solution space by making local 
         changes (like swapping nodes) to the current solution. 
         It avoids revisiting recent solutions by maintaining a 'tabu list', 
         which helps in exploring new areas and escaping local optima.
+
+        Every iteration evaluates the whole neighbourhood of moves between
+        nodes and their nearest neighbours in one batch per operator and
+        applies the best admissible one, even if it makes the solution
+        worse. Swaps which would split a route are not part of the
+        neighbourhood.
         """
         self.graph_manager = graph_manager
-        self.current_best = graph_manager
+        self.instrumentation = instrumentation
+        if instrumentation is not None:
+            instrumentation.labels.setdefault('optimizer', 'tabu_search')
+            instrumentation.lap()
+        # working solution, moves are applied to it in place, the best one
+        # is restored at the end
+        self.current_best = copy.deepcopy(graph_manager)
+        self.best_solution = self.current_best.snapshot()
+        self.best_length = self.current_best.total_length
+        if instrumentation is not None:
+            instrumentation.lap('copy')
         self.max_iterations = max_iterations
+        if search_limit_level is not None:
+            warnings.warn('search_limit_level is deprecated and ignored',
+                          DeprecationWarning, stacklevel=2)
         self.search_limit_level = search_limit_level
         self.tabu_size = tabu_size
-        self.tabu_list = [graph_manager]
+        self.tabu_list = TabuList(tabu_size)
+        self.tabu_attribute = tabu_attribute
+        self.aspiration = aspiration
+        self.candidates = candidates
+        self.random = (np.random.default_rng(seed) if seed is not None
+                       else graph_manager.random)
+        self.customers = self.current_best.customers
+        self.focus = focus
+        self.operators = create_operators(operators)
+        self.stopping = StoppingCriteria(time_limit, target, patience)
+        if max_iterations is None and not self.stopping.bounded:
+            raise ValueError(
+                'max_iterations=None needs time_limit, target or patience')
+        # name of the stopping criterion which ended the run, if any
+        self.stopped_by = None
         #
-        self.initial_best = self.current_best
+        self.initial_best = graph_manager
 
     def optimize(self):
-        for i in range(self.max_iterations):
-            sn = i > self.max_iterations / self.search_limit_level
-            solution = copy.deepcopy(self.current_best)
-            # find 2 random nodes to swap
-            random_node1 = self.select_random_city(solution.node_list)
-            random_node2 = self.select_random_city(solution.node_list)
-            # create tabu list entry
-            tabu_entries = [
-                (random_node1.name, random_node2.name),
-                (random_node2.name, random_node1.name)
-                ]
-            # check if tabu entry is in tabu list
-            for tabu_entry in tabu_entries:
-                if tabu_entry in self.tabu_list:
-                    continue
-                else:
-                    # add tabu entry to tabu list
-                    for tabu_entry in tabu_entries:
-                        self.tabu_list.append(tabu_entry)
-                    # check if tabu is not full
-                    while len(self.tabu_list) > self.tabu_size:
-                        self.tabu_list.pop(0)
-                    # handle swap
-                    solution.handle_swap(random_node1, random_node2, sn)
-                    # update current_best
-                    if solution.total_length < self.current_best.total_length:
-                        self.current_best = solution
+        for _ in self.iterate():
+            pass
+        record = self.instrumentation
+        if record is not None:
+            record.lap()
+        self.current_best.restore(self.best_solution)
+        if record is not None:
+            record.lap('copy')
         return self.current_best
-    
+
+    def iterate(self):
+        """
+        Anytime run: yields an Improvement (length, snapshot, elapsed
+        seconds) after every iteration which found a new best solution,
+        until the last iteration, a stopping criterion or no admissible
+        move. The working solution is left as the search moved it, restore
+        the last snapshot to get the best one.
+        """
+        record = self.instrumentation
+        solution = self.current_best
+        stopping = self.stopping
+        stopping.start()
+        self.stopped_by = None
+        if record is not None:
+            record.lap()
+        first, second = self.candidate_swaps()
+        best_raw_length = solution._total_length
+        if record is not None:
+            record.lap('selection')
+        iterations = (range(self.max_iterations)
+                      if self.max_iterations is not None
+                      else itertools.count())
+        for iteration in iterations:
+            move = self.select_move(solution, first, second, best_raw_length)
+            if move is None:
+                break
+            operator, node1, node2, recorded = move
+            operator.apply(solution, node1, node2)
+            self.tabu_list.extend(recorded)
+            if record is not None:
+                record.lap('apply')
+            improved = solution._total_length < best_raw_length
+            if improved:
+                best_raw_length = solution._total_length
+                self.best_solution = solution.snapshot()
+                self.best_length = solution.total_length
+                if record is not None:
+                    record.lap('copy')
+            if record is not None:
+                record.count('moves_accepted')
+                record.emit('iteration', iteration=iteration,
+                            operator=operator.name,
+                            length=float(solution.total_length),
+                            best_length=float(self.best_length))
+                record.lap()
+            stopping.update(improved)
+            if improved:
+                yield Improvement(self.best_length, self.best_solution,
+                                  stopping.elapsed())
+            self.stopped_by = stopping.check(self.best_length)
+            if self.stopped_by:
+                break
+
+    def candidate_swaps(self):
+        """
+        Pairs of customer ids which form the neighbourhood: every customer
+        with each of its nearest customers, every pair once. With focus only
+        the customers near the focus nodes get candidates.
+        """
+        customers = np.array([node.id for node in self.customers],
+                             dtype=np.int64)
+        first = customers
+        if self.focus is not None:
+            first = np.array(self.current_best.neighbourhood(
+                self.focus, self.candidates), dtype=np.int64)
+        nearest = self.current_best.distance_matrix.nearest(
+            first, self.candidates, candidates=customers)
+        pairs = np.column_stack([np.repeat(first, nearest.shape[1]),
+                                 nearest.ravel()])
+        pairs = np.unique(np.sort(pairs, axis=1), axis=0)
+        return pairs[:, 0], pairs[:, 1]
+
+    def select_move(self, solution, first, second, best_raw_length):
+        """
+        Best admissible move of the neighbourhood: the best one which is not
+        tabu, or which leads to a new best solution when aspiration is on.
+        Operators which are not symmetric are evaluated in both directions.
+        """
+        record = self.instrumentation
+        operators, firsts, seconds, deltas = [], [], [], []
+        for index, operator in enumerate(self.operators):
+            pairs = [(first, second)]
+            if not operator.symmetric:
+                pairs.append((second, first))
+            for a, b in pairs:
+                delta, feasible = operator.evaluate(solution, a, b)
+                operators.append(np.full(np.count_nonzero(feasible), index))
+                firsts.append(a[feasible])
+                seconds.append(b[feasible])
+                deltas.append(delta[feasible])
+                if record is not None:
+                    record.count('moves_tried', len(a))
+                    record.count('moves_infeasible',
+                                 len(a) - len(deltas[-1]))
+        operators, deltas = np.concatenate(operators), np.concatenate(deltas)
+        firsts, seconds = np.concatenate(firsts), np.concatenate(seconds)
+        if record is not None:
+            record.lap('evaluation')
+        for index in np.argsort(deltas, kind='stable').tolist():
+            operator = self.operators[operators[index]]
+            node1, node2 = int(firsts[index]), int(seconds[index])
+            checked, recorded = self.move_attributes(solution, operator,
+                                                     node1, node2)
+            if (not self.tabu_list.is_tabu(checked)
+                    or (self.aspiration and solution._total_length
+                        + deltas[index] < best_raw_length - 1e-9)):
+                if record is not None:
+                    record.lap('selection')
+                return operator, node1, node2, recorded
+            if record is not None:
+                record.count('moves_tabu')
+        if record is not None:
+            record.lap('selection')
+
+    def move_attributes(self, solution, operator, node1, node2):
+        """
+        Attributes of the move of node ids node1 and node2: those which make
+        the move tabu and those which are made tabu by it.
+        """
+        if self.tabu_attribute == 'move':
+            entry = (min(node1, node2), max(node1, node2))
+            if operator.name != 'swap':
+                entry = ((operator.name,) + entry if operator.symmetric
+                         else (operator.name, node1, node2))
+            return (entry,), (entry,)
+        if self.tabu_attribute == 'node_route':
+            moved = operator.moved(solution, node1, node2)
+            return (tuple((node, target) for node, _, target in moved),
+                    tuple((node, source) for node, source, _ in moved))
+        if self.tabu_attribute == 'edge':
+            added, removed = operator.edges(solution, node1, node2)
+            return self._edges(added), self._edges(removed)
+        raise ValueError(f'Unknown tabu attribute {self.tabu_attribute}')
+
+    def _edges(self, pairs):
+        return tuple((min(a, b), max(a, b)) for a, b in pairs if a != b)
+
     def select_random_city(self, graph):
         choices = [node for node in graph if not node.is_depot]
         if choices:
-            return random.choice(choices)
+            return choices[self.random.integers(len(choices))]
         
     def to_fleet(self):
         fleet = [Vehicle(i+1) for i in range(self.graph_manager.vehicles)]
@@ -99,12 +304,14 @@ class TabuSearch():
             '---------------Tabu Search Algorithm---------------',
             f"Iterations           : {self.max_iterations}",
             f"Tabu List Size       : {self.tabu_size}",
+            f"Candidate List Size  : {self.candidates}",
             f"Fleet size           : {self.graph_manager.vehicles}",
             f"Vehicle Capacity     : {self.graph_manager.max_cap}", 
             f"Total Locations      : {num_cities}",
             f"Total Depots         : {num_depots}",
             f"Initial Shortest     : {self.initial_best.total_length}",
-            f"Current Shortest     : {self.current_best.total_length}",
+            f"Current Shortest     : {self.best_length}",
+            f"Stopped By           : {self.stopped_by}",
             '---------------------------------------------------',
         ])
     
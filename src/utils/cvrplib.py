@@ -0,0 +1,172 @@
+import os
+import re
+from collections import namedtuple
+
+import numpy as np
+
+try:
+    from src.algorithms.models.distance_matrix import DistanceMatrix
+    from src.algorithms.models.node import NodeList
+except:
+    from algorithms.models.distance_matrix import DistanceMatrix
+    from algorithms.models.node import NodeList
+
+
+CVRPInstance = namedtuple('CVRPInstance', ['name', 'node_list', 'capacity',
+                                           'vehicles', 'optimal'])
+
+# column orders of a symmetric matrix read as the equivalent row order
+EDGE_WEIGHT_FORMATS = {
+    'LOWER_COL': 'UPPER_ROW',
+    'UPPER_COL': 'LOWER_ROW',
+    'LOWER_DIAG_COL': 'UPPER_DIAG_ROW',
+    'UPPER_DIAG_COL': 'LOWER_DIAG_ROW',
+}
+
+
+def read_vrp(file_path, rounded=True):
+    """
+    Load a CVRPLIB (TSPLIB format) `.vrp` file.
+
+    Args:
+        file_path : Path of the file.
+        rounded   : Round EUC_2D distances to the nearest integer, as the
+                    known optimal values of CVRPLIB do.
+
+    Returns a CVRPInstance with the NodeList, whose distance matrix is
+    read from the file (EXPLICIT) or computed from the coordinates (EUC_2D,
+    CEIL_2D), the vehicle capacity, the number of vehicles and the known
+    optimal (or best) length, None when neither the file nor a `.sol` file
+    next to it gives them.
+
+    Planar coordinates are mapped into a patch of at most one degree at the
+    equator, where great-circle distances are proportional to planar ones
+    within 0.02%, so spatial queries of the NodeList and the construction
+    heuristics keep working. Nodes of files with an explicit matrix and
+    without DISPLAY_DATA_SECTION all lie at (0, 0).
+    """
+    header, sections = _parse(file_path)
+    dimension = int(header['DIMENSION'])
+    ids = np.arange(1, dimension + 1)
+
+    coordinates = sections.get('NODE_COORD_SECTION',
+                               sections.get('DISPLAY_DATA_SECTION'))
+    if coordinates:
+        points = np.array(coordinates, dtype=np.float64).reshape(-1, 3)
+        ids = points[:, 0].astype(np.int64)
+        xs, ys = points[:, 1], points[:, 2]
+    else:
+        xs = ys = np.zeros(dimension)
+
+    demands = dict(np.array(sections['DEMAND_SECTION'], dtype=np.int64)
+                   .reshape(-1, 2).tolist())
+    depots = set(int(value) for value in sections.get('DEPOT_SECTION', ['1'])
+                 if int(value) != -1)
+    weights = np.array([demands.get(int(node_id), 0) for node_id in ids])
+    is_depots = np.isin(ids, list(depots))
+    weights[is_depots] = 0
+
+    extent = max(np.ptp(xs), np.ptp(ys)) or 1
+    node_list = NodeList.from_arrays([str(node_id) for node_id in ids],
+                                     (ys - ys.min()) / extent,
+                                     (xs - xs.min()) / extent,
+                                     weights, is_depots)
+    node_list.distance_matrix = DistanceMatrix(
+        _distance_matrix(header, sections, xs, ys, dimension, rounded))
+    return CVRPInstance(header.get('NAME', os.path.basename(file_path)),
+                        node_list, int(header['CAPACITY']),
+                        _vehicles(header), _optimal(header, file_path))
+
+
+def read_solution(file_path):
+    """
+    Cost of a CVRPLIB `.sol` file, None when it has none.
+    """
+    with open(file_path, encoding='utf-8') as f:
+        for line in f:
+            match = re.match(r'\s*cost\s+([\d.]+)', line, re.IGNORECASE)
+            if match:
+                return float(match.group(1))
+
+
+def gap(length, optimal):
+    """
+    Relative distance of a solution length from the optimal one, in percent.
+    """
+    return 100 * (length - optimal) / optimal
+
+
+def _parse(file_path):
+    header, sections = {}, {}
+    section = None
+    with open(file_path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line == 'EOF':
+                continue
+            key = line.split(':')[0].strip().upper()
+            if key.endswith('_SECTION'):
+                section = sections.setdefault(key, [])
+            elif ':' in line and not key[0].isdigit() and key[0] != '-':
+                header[key] = line.split(':', 1)[1].strip()
+                section = None
+            elif section is not None:
+                section += line.split()
+    return header, sections
+
+
+def _distance_matrix(header, sections, xs, ys, dimension, rounded):
+    kind = header.get('EDGE_WEIGHT_TYPE', 'EUC_2D').upper()
+    if kind in ('EUC_2D', 'CEIL_2D'):
+        matrix = np.hypot(xs[:, None] - xs[None, :],
+                          ys[:, None] - ys[None, :])
+        if kind == 'CEIL_2D':
+            return np.ceil(matrix)
+        return np.floor(matrix + 0.5) if rounded else matrix
+    if kind != 'EXPLICIT':
+        raise ValueError(f'Unsupported EDGE_WEIGHT_TYPE {kind}')
+    values = np.array(sections['EDGE_WEIGHT_SECTION'], dtype=np.float64)
+    form = header.get('EDGE_WEIGHT_FORMAT', 'FULL_MATRIX').upper()
+    form = EDGE_WEIGHT_FORMATS.get(form, form)
+    if form == 'FULL_MATRIX':
+        return values[:dimension * dimension].reshape(dimension, dimension)
+    triangles = {
+        'LOWER_ROW': lambda: np.tril_indices(dimension, -1),
+        'LOWER_DIAG_ROW': lambda: np.tril_indices(dimension),
+        'UPPER_ROW': lambda: np.triu_indices(dimension, 1),
+        'UPPER_DIAG_ROW': lambda: np.triu_indices(dimension),
+    }
+    if form not in triangles:
+        raise ValueError(f'Unsupported EDGE_WEIGHT_FORMAT {form}')
+    rows, columns = triangles[form]()
+    matrix = np.zeros((dimension, dimension))
+    matrix[rows, columns] = values[:len(rows)]
+    matrix[columns, rows] = values[:len(rows)]
+    return matrix
+
+
+def _vehicles(header):
+    for text in (header.get('VEHICLES'), header.get('COMMENT'),
+                 header.get('NAME')):
+        match = re.search(r'(?:trucks:?\s*|-k|^)(\d+)\b', text or '',
+                          re.IGNORECASE)
+        if match:
+            return int(match.group(1))
+
+
+def _optimal(header, file_path):
+    match = re.search(r'(?:optimal|best)\s*value:?\s*([\d.]+)',
+                      header.get('COMMENT', ''), re.IGNORECASE)
+    if match:
+        return float(match.group(1))
+    solution_path = os.path.splitext(file_path)[0] + '.sol'
+    if os.path.exists(solution_path):
+        return read_solution(solution_path)
+
+
+if __name__ == "__main__":
+    import sys
+
+    instance = read_vrp(sys.argv[1])
+    print(instance.name, len(instance.node_list), instance.capacity,
+          instance.vehicles, instance.optimal)
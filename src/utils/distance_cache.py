@@ -0,0 +1,162 @@
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    from src.utils.distance_matrix import build_distance_matrix, coordinates
+except:
+    from distance_matrix import build_distance_matrix, coordinates
+
+
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache',
+                                 'vehicle_routing_problem')
+
+
+class DistanceCache:
+    def __init__(self, directory=None, max_bytes=2 ** 30) -> None:
+        """
+        On-disk cache of distance matrices stored as `.npy` files and opened
+        memory-mapped, so solving the same instance again (in any process)
+        does not recompute distances.
+
+        Args:
+            directory : Cache directory, the VRP_DISTANCE_CACHE environment
+                        variable or ~/.cache/vehicle_routing_problem by
+                        default.
+            max_bytes : Size limit of the directory. The least recently
+                        used matrices are deleted when it is exceeded.
+
+        Matrices are keyed by a fingerprint of the node coordinates (in node
+        order), the element type and the source of the distances.
+        """
+        self.directory = (directory or os.environ.get('VRP_DISTANCE_CACHE')
+                          or DEFAULT_DIRECTORY)
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def fingerprint(source, dtype=np.float64, origin='haversine'):
+        """
+        Key of the matrix of a NodeList or DataFrame, see
+        `src.utils.distance_matrix.coordinates`.
+        """
+        lats, lons = coordinates(source)
+        digest = hashlib.sha1()
+        digest.update(lats.tobytes())
+        digest.update(lons.tobytes())
+        digest.update(np.dtype(dtype).str.encode())
+        digest.update(origin.encode())
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f'{key}.npy')
+
+    def load(self, key):
+        """
+        Memory-mapped matrix stored under key, or None.
+        """
+        path = self.path(key)
+        try:
+            matrix = np.load(path, mmap_mode='r')
+        except FileNotFoundError:
+            return None
+        # mark as recently used
+        os.utime(path)
+        return matrix
+
+    def store(self, key, matrix):
+        with self._writer(key, matrix.shape, matrix.dtype) as out:
+            out[:] = matrix
+        return self.load(key)
+
+    def get_or_build(self, source, dtype=np.float64):
+        """
+        Matrix of great-circle distances of a NodeList or DataFrame, built
+        and stored on the first request.
+        """
+        key = self.fingerprint(source, dtype)
+        matrix = self.load(key)
+        if matrix is None:
+            size = len(coordinates(source)[0])
+            with self._writer(key, (size, size), dtype) as out:
+                build_distance_matrix(source, out=out)
+            matrix = self.load(key)
+        return matrix
+
+    def import_file(self, file_path, node_list):
+        """
+        Matrix of a distance file (like `data/distance_matrix.csv`) for the
+        nodes of node_list. The file is parsed only when it is not cached
+        yet or when it has changed.
+        """
+        # import here, models depend on this module
+        from src.algorithms.models.distance_matrix import DistanceMatrix
+
+        stat = os.stat(file_path)
+        origin = f'{os.path.abspath(file_path)}:{stat.st_mtime_ns}:{stat.st_size}'
+        key = self.fingerprint(node_list, origin=origin)
+        matrix = self.load(key)
+        if matrix is None:
+            parsed = DistanceMatrix.from_file(file_path, node_list)
+            matrix = self.store(key, parsed.matrix)
+        return matrix
+
+    def evict(self, keep=None):
+        """
+        Delete the least recently used matrices until the directory fits
+        in max_bytes. The matrix stored under keep is never deleted.
+        """
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.npy'):
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append((stat.st_mtime, stat.st_size, name))
+        total = sum([size for _, size, _ in files])
+        for _, size, name in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if keep is not None and name == f'{keep}.npy':
+                continue
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                # removed by another process
+                pass
+            total -= size
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.npy'):
+                os.remove(os.path.join(self.directory, name))
+
+    @contextmanager
+    def _writer(self, key, shape, dtype):
+        """
+        Memory-mapped temporary file, moved into the cache when the block
+        exits without errors, so other processes never read partial files.
+        """
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        os.close(fd)
+        try:
+            out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype,
+                                            shape=shape)
+            yield out
+            out.flush()
+            del out
+            os.replace(tmp_path, self.path(key))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self.evict(keep=key)
+
+
+if __name__ == "__main__":
+    from src.algorithms.models.node import NodeList
+
+    node_list = NodeList.from_flie('./data/orders_with_depots.csv')
+    cache = DistanceCache()
+    print(cache.get_or_build(node_list)[:3, :3])
+    print(cache.import_file('./data/distance_matrix.csv', node_list)[:3, :3])
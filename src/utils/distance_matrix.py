@@ -1,48 +1,82 @@
-# this can be used for optimization
-from math import radians, cos, sin, asin, sqrt
+import csv
+
 import numpy as np
-import pandas as pd
 
+try:
+    from src.utils.haversine import haversine_matrix
+except:
+    from haversine import haversine_matrix
+
+
+# number of cells computed at once by build_distance_matrix
+CHUNK_CELLS = 2 ** 22
 
-def haversine(lon1, lat1, lon2, lat2):
-    # Convert decimal degrees to radians
-    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
 
-    # Haversine formula
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-    c = 2 * asin(sqrt(a))
-    r = 6371  # Radius of Earth in kilometers
-    return c * r
+def coordinates(source):
+    """
+    Latitudes and longitudes of a NodeList (or any iterable of nodes) or of
+    a DataFrame with `latitude` and `longitude` columns.
+    """
+    if hasattr(source, 'columns'):
+        return (np.asarray(source['latitude'], dtype=np.float64),
+                np.asarray(source['longitude'], dtype=np.float64))
+    if hasattr(source, 'lats'):
+        # columns of a NodeList
+        return source.lats, source.lons
+    nodes = list(source)
+    return (np.array([node.lat for node in nodes], dtype=np.float64),
+            np.array([node.lon for node in nodes], dtype=np.float64))
 
 
-input_df = pd.read_csv("./orders.csv")
-print(input_df)
+def build_distance_matrix(source, dtype=np.float64, chunk_size=None, out=None):
+    """
+    Great-circle distances in kilometers between all points of a NodeList
+    or DataFrame (see `coordinates`).
 
-# Create an empty distance matrix
-num_cities = len(input_df)
-distance_matrix = np.zeros((num_cities, num_cities))
+    Args:
+        source     : NodeList or DataFrame with the points.
+        dtype      : Type of the result, float32 halves the memory.
+        chunk_size : Number of rows computed at once. By default it is
+                     chosen so that a chunk has about CHUNK_CELLS cells, which
+                     keeps temporary arrays small for large instances.
+        out        : Optional preallocated (n, n) array, e.g. a memory-mapped
+                     file, to write the matrix into.
+    """
+    lats, lons = coordinates(source)
+    size = len(lats)
+    if out is None:
+        out = np.empty((size, size), dtype=dtype)
+    if chunk_size is None:
+        chunk_size = max(1, CHUNK_CELLS // max(size, 1))
+    for start in range(0, size, chunk_size):
+        stop = min(start + chunk_size, size)
+        out[start:stop] = haversine_matrix(lats[start:stop], lons[start:stop],
+                                           lats, lons, dtype=out.dtype)
+    # the formula is not exactly zero for a point and itself in float32
+    np.fill_diagonal(out, 0)
+    return out
 
-# Calculate distances and fill in the matrix
-for i in range(num_cities):
-    for j in range(num_cities):
-        if i != j:
-            lat1 = input_df["latitude"][i]
-            lng1 = input_df["longitude"][i]
-            lat2 = input_df["latitude"][j]
-            lng2 = input_df["longitude"][j]
-            distance_matrix[i][j] = haversine(lat1, lng1, lat2, lng2)
 
-# Display the distance matrix
-print(distance_matrix)
+def write_distance_matrix(file_path, matrix, names):
+    """
+    Save a matrix in the format of `data/distance_matrix.csv`, with names
+    in the header row and the first column.
+    """
+    with open(file_path, mode='w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow([''] + list(names))
+        for name, row in zip(names, matrix):
+            writer.writerow([name] + [repr(float(value)) for value in row])
 
-df = pd.DataFrame(distance_matrix)
 
-cities_map = {index: city for index, city in enumerate(list(input_df["city"]))}
+if __name__ == "__main__":
+    import pandas as pd
 
-df.rename(index=cities_map, columns=cities_map, inplace=True)
+    input_df = pd.read_csv("./orders.csv")
+    print(input_df)
 
-print(df)
+    distance_matrix = build_distance_matrix(input_df)
+    print(distance_matrix)
 
-df.to_csv("./distance_matrix.csv")
+    write_distance_matrix("./distance_matrix.csv", distance_matrix,
+                          list(input_df["city"]))
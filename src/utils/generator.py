@@ -0,0 +1,64 @@
+import numpy as np
+
+try:
+    from src.algorithms.models.node import NodeList
+except:
+    from algorithms.models.node import NodeList
+
+
+# latitude and longitude ranges of Poland, where the data/ orders are
+BOUNDS = ((49.0, 54.8), (14.1, 24.1))
+KM_PER_DEGREE = 111.2
+
+
+def generate_node_list(size, kind='random', depots=1, orders=(10, 200),
+                       clusters=None, spread=20, bounds=BOUNDS, seed=None):
+    """
+    Synthetic instance in the NodeList schema, save it with
+    `NodeList.to_csv`.
+
+    Args:
+        size     : Number of nodes, depots included.
+        kind     : Placement of the customers: 'random' (uniform in the
+                   bounds), 'clustered' (around cluster centers) or 'mixed'
+                   (half of each, like the Solomon RC instances).
+        depots   : Number of depots, placed uniformly in the bounds.
+        orders   : Range of the customer orders, both ends included.
+        clusters : Number of clusters, about one per 50 customers by default.
+        spread   : Standard deviation of the distance of customers from
+                   their cluster center in kilometers.
+        bounds   : ((min_lat, max_lat), (min_lon, max_lon)) of the nodes.
+        seed     : Seed or NumPy Generator.
+    """
+    rng = np.random.default_rng(seed)
+    (min_lat, max_lat), (min_lon, max_lon) = bounds
+    customers = size - depots
+    clustered = {'random': 0, 'clustered': customers,
+                 'mixed': customers // 2}[kind]
+    lats = rng.uniform(min_lat, max_lat, size)
+    lons = rng.uniform(min_lon, max_lon, size)
+    if clustered:
+        clusters = clusters or max(1, clustered // 50)
+        centers = rng.integers(clusters, size=clustered)
+        center_lats = rng.uniform(min_lat, max_lat, clusters)[centers]
+        center_lons = rng.uniform(min_lon, max_lon, clusters)[centers]
+        scale = spread / KM_PER_DEGREE
+        cluster_lats = center_lats + rng.normal(0, scale, clustered)
+        cluster_lons = center_lons + rng.normal(
+            0, scale, clustered) / np.cos(np.radians(center_lats))
+        lats[depots:depots + clustered] = np.clip(cluster_lats, min_lat, max_lat)
+        lons[depots:depots + clustered] = np.clip(cluster_lons, min_lon, max_lon)
+    weights = rng.integers(orders[0], orders[1] + 1, size)
+    is_depots = np.zeros(size, dtype=bool)
+    is_depots[:depots] = True
+    weights[:depots] = 0
+    names = ([f'Depot {index}' for index in range(depots)]
+             + [f'Stop {index}' for index in range(1, customers + 1)])
+    return NodeList.from_arrays(names, lats, lons, weights, is_depots)
+
+
+if __name__ == "__main__":
+    import sys
+
+    size, kind, file_path = int(sys.argv[1]), sys.argv[2], sys.argv[3]
+    generate_node_list(size, kind, seed=0).to_csv(file_path)
@@ -1,5 +1,7 @@
 from math import radians, sin, cos, asin, sqrt
 
+import numpy as np
+
 
 def haversine(lon1, lat1, lon2, lat2):
     # Convert decimal degrees to radians
@@ -11,4 +13,26 @@ def haversine(lon1, lat1, lon2, lat2):
     a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
     c = 2 * asin(sqrt(a))
     r = 6371 # Radius of Earth in kilometers
-    return c * r
\ No newline at end of file
+    return c * r
+
+
+def haversine_matrix(lats, lons, lats2=None, lons2=None, dtype=np.float64):
+    """
+    Distances in kilometers between every point of (lats, lons) and every
+    point of (lats2, lons2), computed in one broadcasted operation. The
+    second set of points defaults to the first one.
+    """
+    lat1 = np.radians(np.asarray(lats, dtype=np.float64))[:, None]
+    lon1 = np.radians(np.asarray(lons, dtype=np.float64))[:, None]
+    if lats2 is None:
+        lat2, lon2 = lat1.T, lon1.T
+    else:
+        lat2 = np.radians(np.asarray(lats2, dtype=np.float64))[None, :]
+        lon2 = np.radians(np.asarray(lons2, dtype=np.float64))[None, :]
+
+    # Haversine formula
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    c = 2 * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+    r = 6371 # Radius of Earth in kilometers
+    return (c * r).astype(dtype, copy=False)
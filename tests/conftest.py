@@ -0,0 +1,30 @@
+import pytest
+
+from src.algorithms.models.array_route import ArrayRoute
+from src.algorithms.models.doubly_linked_list import DoublyLinkedList
+from src.algorithms.models.graph_manager import GraphManager
+from src.utils.generator import generate_node_list
+
+
+@pytest.fixture(params=[DoublyLinkedList, ArrayRoute],
+                ids=lambda route_class: route_class.__name__)
+def route_class(request):
+    return request.param
+
+
+@pytest.fixture
+def create_graph_manager(route_class):
+    """
+    Factory of GraphManagers over one 4-depot instance, with the routes
+    of route_class.
+    """
+    def create(construction='sequential'):
+        return GraphManager(generate_node_list(200, depots=4, seed=0),
+                            max_cap=1000, vehicles=5, route_class=route_class,
+                            construction=construction)
+    return create
+
+
+@pytest.fixture
+def graph_manager(create_graph_manager):
+    return create_graph_manager()
@@ -0,0 +1,32 @@
+from math import exp
+
+import pytest
+
+from src.algorithms.cooling import initial_temperature
+from src.algorithms.simulated_annealing import SimulatedAnnealing
+
+
+def test_initial_temperature():
+    deltas = [-5.0, 0.0, 10.0, 20.0, 30.0]
+    temperature = initial_temperature(deltas, acceptance=0.5)
+    # the median worsening move is accepted with probability acceptance
+    assert exp(-20.0 / temperature) == pytest.approx(0.5)
+    assert initial_temperature(deltas, acceptance=0.1) < temperature
+
+
+def test_initial_temperature_without_worse_moves():
+    assert initial_temperature([-1.0, 0.0]) == 1.0
+    assert initial_temperature([]) == 1.0
+
+
+@pytest.mark.parametrize('acceptance', [0, 1, -0.1, 1.5, float('nan')])
+def test_initial_temperature_acceptance_out_of_range(acceptance):
+    with pytest.raises(ValueError):
+        initial_temperature([10.0, 20.0], acceptance=acceptance)
+
+
+def test_auto_temperature_acceptance_out_of_range(graph_manager):
+    with pytest.raises(ValueError):
+        SimulatedAnnealing(graph_manager, epochs=1, attempts=10,
+                           initial_temp='auto', cooling_rate=0.9,
+                           initial_acceptance=1)
@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+from src.algorithms.models.node import NodeList
+from src.utils.cvrplib import gap, read_solution, read_vrp
+
+
+EUC_2D = """NAME : tiny-n4-k2
+COMMENT : (Test instance, Optimal value: 42)
+TYPE : CVRP
+DIMENSION : 4
+EDGE_WEIGHT_TYPE : EUC_2D
+CAPACITY : 10
+NODE_COORD_SECTION
+ 1 0 0
+ 2 3 4
+ 3 0 7
+ 4 1.5 0
+DEMAND_SECTION
+1 0
+2 4
+3 5
+4 6
+DEPOT_SECTION
+ 1
+ -1
+EOF
+"""
+
+# the same symmetric matrix in different EDGE_WEIGHT_FORMATs
+MATRIX = np.array([[0, 1, 2, 3],
+                   [1, 0, 4, 5],
+                   [2, 4, 0, 6],
+                   [3, 5, 6, 0]], dtype=float)
+FORMATS = {
+    'FULL_MATRIX': '0 1 2 3\n1 0 4 5\n2 4 0 6\n3 5 6 0',
+    'LOWER_ROW': '1\n2 4\n3 5 6',
+    'LOWER_DIAG_ROW': '0\n1 0\n2 4 0\n3 5 6 0',
+    'UPPER_ROW': '1 2 3\n4 5\n6',
+    'UPPER_DIAG_ROW': '0 1 2 3\n0 4 5\n0 6\n0',
+    'LOWER_COL': '1 2 3\n4 5\n6',
+    'UPPER_COL': '1\n2 4\n3 5 6',
+}
+
+
+def explicit(form):
+    return f"""NAME : explicit-n4
+COMMENT : (Trucks: 3)
+TYPE : CVRP
+DIMENSION : 4
+EDGE_WEIGHT_TYPE : EXPLICIT
+EDGE_WEIGHT_FORMAT : {form}
+CAPACITY : 20
+EDGE_WEIGHT_SECTION
+{FORMATS[form]}
+DEMAND_SECTION
+1 0
+2 3
+3 4
+4 5
+DEPOT_SECTION
+1
+-1
+EOF
+"""
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def test_euc_2d(tmp_path):
+    instance = read_vrp(write(tmp_path, 'tiny-n4-k2.vrp', EUC_2D))
+    assert instance.name == 'tiny-n4-k2'
+    assert instance.capacity == 10
+    assert instance.vehicles == 2
+    assert instance.optimal == 42
+    node_list = instance.node_list
+    assert node_list.names == ['1', '2', '3', '4']
+    assert node_list.is_depots.tolist() == [True, False, False, False]
+    assert node_list.weights.tolist() == [0, 4, 5, 6]
+    matrix = node_list.distance_matrix.matrix
+    assert matrix[0, 1] == 5
+    assert matrix[1, 2] == 4
+    # 1.5 is rounded to the nearest integer, halves up
+    assert matrix[0, 3] == 2
+    np.testing.assert_array_equal(matrix, matrix.T)
+
+
+def test_euc_2d_unrounded(tmp_path):
+    instance = read_vrp(write(tmp_path, 'tiny.vrp', EUC_2D), rounded=False)
+    assert instance.node_list.distance_matrix.matrix[0, 3] == 1.5
+
+
+@pytest.mark.parametrize('form', sorted(FORMATS))
+def test_explicit(tmp_path, form):
+    instance = read_vrp(write(tmp_path, 'explicit-n4.vrp', explicit(form)))
+    np.testing.assert_array_equal(instance.node_list.distance_matrix.matrix,
+                                  MATRIX)
+    assert instance.vehicles == 3
+    assert instance.capacity == 20
+    assert instance.optimal is None
+
+
+def test_optimal_from_solution_file(tmp_path):
+    path = write(tmp_path, 'explicit-n4.vrp', explicit('LOWER_ROW'))
+    write(tmp_path, 'explicit-n4.sol',
+          'Route #1: 1 2\nRoute #2: 3\nCost 14\n')
+    assert read_solution(str(tmp_path / 'explicit-n4.sol')) == 14
+    assert read_vrp(path).optimal == 14
+    assert gap(15.4, 14) == pytest.approx(10)
+
+
+def test_unsupported_edge_weight_type(tmp_path):
+    text = EUC_2D.replace('EUC_2D', 'GEO')
+    with pytest.raises(ValueError):
+        read_vrp(write(tmp_path, 'geo.vrp', text))
+
+
+def test_node_list_from_file(tmp_path):
+    node_list = NodeList.from_flie(write(tmp_path, 'tiny.vrp', EUC_2D))
+    assert len(node_list) == 4
+    assert node_list.distance_matrix.matrix[0, 1] == 5
@@ -0,0 +1,81 @@
+import copy
+import os
+
+import numpy as np
+import pytest
+
+from src.algorithms.models.construction import CONSTRUCTIONS
+from src.algorithms.models.graph_manager import GraphManager
+from src.algorithms.models.moves import OPERATORS
+from src.algorithms.models.node import NodeList
+from src.algorithms.tabu_search import TabuSearch
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def assert_routes_closed(graph_manager):
+    for cycle in graph_manager.cycles:
+        nodes = cycle.to_list()
+        assert nodes[0].is_depot and nodes[-1].is_depot
+        assert nodes[0].id == nodes[-1].id, str(cycle)
+        assert not any(node.is_depot for node in nodes[1:-1])
+
+
+@pytest.mark.parametrize('construction', sorted(CONSTRUCTIONS))
+def test_initial_routes(create_graph_manager, construction):
+    assert_routes_closed(create_graph_manager(construction))
+
+
+def test_swaps_with_splits(graph_manager):
+    routes = len(graph_manager.cycles)
+    rng = np.random.default_rng(0)
+    customers = graph_manager.customers
+    for _ in range(3000):
+        node1, node2 = (customers[index] for index
+                        in rng.integers(len(customers), size=2))
+        graph_manager.handle_swap(node1, node2)
+    # splits happened
+    assert len(graph_manager.cycles) > routes
+    assert_routes_closed(graph_manager)
+
+
+@pytest.mark.parametrize('name', sorted(OPERATORS))
+def test_moves(graph_manager, name):
+    operator = OPERATORS[name]()
+    rng = np.random.default_rng(1)
+    ids = np.array([node.id for node in graph_manager.customers])
+    for _ in range(300):
+        a, b = (int(node_id) for node_id in rng.choice(ids, 2, replace=False))
+        if operator.evaluate(graph_manager, a, b)[1]:
+            operator.apply(graph_manager, a, b)
+    assert_routes_closed(graph_manager)
+
+
+def test_insert_and_remove_customers(graph_manager):
+    for index, (lat, lon) in enumerate([(50.0, 19.9), (54.3, 18.6),
+                                        (52.2, 21.0), (51.1, 17.0)]):
+        graph_manager.add_customer(f'New {index}', lat, lon, 600)
+    for node in graph_manager.customers[:20]:
+        graph_manager.remove_customer(node)
+    assert_routes_closed(graph_manager)
+
+
+def test_copies_grow_independently(graph_manager):
+    other = copy.deepcopy(graph_manager)
+    graph_manager.add_customer('Kielce', 50.87, 20.63, 100)
+    other.add_customer('Radom', 51.40, 21.15, 50)
+    other.add_customer('Płock', 52.55, 19.70, 50)
+    assert len(graph_manager.distance_matrix) == len(graph_manager.node_list)
+    assert len(other.distance_matrix) == len(other.node_list)
+    assert_routes_closed(graph_manager)
+    assert_routes_closed(other)
+
+
+def test_tabu_search_two_opt_star():
+    graph_manager = GraphManager(
+        NodeList.from_flie(os.path.join(DATA_DIR, 'orders_multiple_depots.csv')),
+        max_cap=1000, vehicles=5, seed=0)
+    tabu_search = TabuSearch(graph_manager, max_iterations=100, tabu_size=30,
+                             operators=('two_opt_star',), seed=0)
+    assert_routes_closed(tabu_search.optimize())
@@ -0,0 +1,127 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from src.algorithms.models.distance_matrix import DistanceMatrix
+from src.algorithms.models.node import NodeList
+from src.utils import distance_cache
+from src.utils.distance_cache import DistanceCache
+from src.utils.distance_matrix import build_distance_matrix
+from src.utils.generator import generate_node_list
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DistanceCache(str(tmp_path / 'cache'))
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    """
+    Calls of build_distance_matrix made by the cache.
+    """
+    calls = []
+
+    def build(source, out=None):
+        calls.append(source)
+        return build_distance_matrix(source, out=out)
+    monkeypatch.setattr(distance_cache, 'build_distance_matrix', build)
+    return calls
+
+
+def cached_files(cache):
+    return sorted(name for name in os.listdir(cache.directory)
+                  if name.endswith('.npy'))
+
+
+def test_miss_then_hit(cache, builds):
+    node_list = generate_node_list(50, seed=0)
+    matrix = cache.get_or_build(node_list)
+    assert len(builds) == 1
+    assert cached_files(cache) == [f'{cache.fingerprint(node_list)}.npy']
+    again = cache.get_or_build(node_list)
+    assert len(builds) == 1
+    assert isinstance(again, np.memmap)
+    np.testing.assert_array_equal(again, matrix)
+    np.testing.assert_allclose(matrix, build_distance_matrix(node_list))
+    # another process, or a new cache object, finds the file as well
+    DistanceCache(cache.directory).get_or_build(node_list)
+    assert len(builds) == 1
+
+
+def test_fingerprint(cache, builds):
+    node_list = generate_node_list(50, seed=0)
+    other = generate_node_list(50, seed=1)
+    key = cache.fingerprint(node_list)
+    assert key == cache.fingerprint(generate_node_list(50, seed=0))
+    assert key != cache.fingerprint(other)
+    assert key != cache.fingerprint(node_list, dtype=np.float32)
+    assert key != cache.fingerprint(node_list, origin='file')
+    cache.get_or_build(node_list)
+    cache.get_or_build(other)
+    cache.get_or_build(node_list, dtype=np.float32)
+    assert len(builds) == 3
+    assert len(cached_files(cache)) == 3
+
+
+def test_evicts_least_recently_used(cache):
+    matrices = {key: np.full((10, 10), index, dtype=np.float64)
+                for index, key in enumerate(['a', 'b', 'c'])}
+    for key, matrix in matrices.items():
+        cache.store(key, matrix)
+    size = os.path.getsize(cache.path('a'))
+    # a is the oldest file, then c and b
+    for key, mtime in [('a', 1000), ('b', 3000), ('c', 2000)]:
+        os.utime(cache.path(key), (mtime, mtime))
+    cache.max_bytes = 3 * size
+    cache.store('d', matrices['a'])
+    assert cached_files(cache) == ['b.npy', 'c.npy', 'd.npy']
+    # loading marks c as recently used, b is evicted next
+    os.utime(cache.path('d'), (4000, 4000))
+    cache.load('c')
+    cache.store('e', matrices['a'])
+    assert cached_files(cache) == ['c.npy', 'd.npy', 'e.npy']
+
+
+def test_evict_keeps_new_matrix(cache):
+    cache.max_bytes = 1
+    cache.store('a', np.zeros((10, 10)))
+    assert cached_files(cache) == ['a.npy']
+    cache.store('b', np.zeros((10, 10)))
+    assert cached_files(cache) == ['b.npy']
+
+
+def test_import_file(cache, tmp_path, monkeypatch):
+    node_list = NodeList.from_flie(os.path.join(DATA_DIR,
+                                                'orders_with_depots.csv'))
+    file_path = str(tmp_path / 'distance_matrix.csv')
+    shutil.copy(os.path.join(DATA_DIR, 'distance_matrix.csv'), file_path)
+    parses = []
+    from_file = DistanceMatrix.from_file.__func__
+
+    def parse(cls, path, nodes):
+        parses.append(path)
+        return from_file(cls, path, nodes)
+    monkeypatch.setattr(DistanceMatrix, 'from_file', classmethod(parse))
+
+    matrix = cache.import_file(file_path, node_list)
+    np.testing.assert_array_equal(
+        matrix, from_file(DistanceMatrix, file_path, node_list).matrix)
+    assert len(parses) == 1
+    np.testing.assert_array_equal(cache.import_file(file_path, node_list),
+                                  matrix)
+    assert len(parses) == 1
+
+    # a changed file is parsed again
+    with open(file_path, encoding='utf-8') as f:
+        text = f.read()
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(text.replace('406.5616', '400.0', 1))
+    changed = cache.import_file(file_path, node_list)
+    assert len(parses) == 2
+    assert (changed != matrix).sum() == 1
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from src.algorithms.models.moves import OPERATORS
+
+
+def measured_length(graph_manager):
+    return sum(cycle._measure_length() for cycle in graph_manager.cycles)
+
+
+@pytest.mark.parametrize('name', sorted(OPERATORS))
+def test_evaluate_matches_apply(graph_manager, name):
+    operator = OPERATORS[name]()
+    rng = np.random.default_rng(1)
+    ids = np.array([node.id for node in graph_manager.customers])
+    applied = 0
+    for _ in range(300):
+        a, b = (int(node_id) for node_id in rng.choice(ids, 2, replace=False))
+        delta, feasible = operator.evaluate(graph_manager, a, b)
+        if not feasible:
+            continue
+        assert operator.apply(graph_manager, a, b) == pytest.approx(
+            float(delta), abs=1e-6)
+        applied += 1
+    assert applied > 0
+    assert graph_manager._total_length == pytest.approx(
+        measured_length(graph_manager), abs=1e-6)
+
+
+@pytest.mark.parametrize('name', sorted(OPERATORS))
+def test_undo_restores_solution(graph_manager, name):
+    operator = OPERATORS[name]()
+    rng = np.random.default_rng(2)
+    ids = np.array([node.id for node in graph_manager.customers])
+    for _ in range(100):
+        a, b = (int(node_id) for node_id in rng.choice(ids, 2, replace=False))
+        if not operator.evaluate(graph_manager, a, b)[1]:
+            continue
+        snapshot = graph_manager.snapshot()
+        length = graph_manager._total_length
+        operator.apply(graph_manager, a, b)
+        graph_manager.undo()
+        assert graph_manager.snapshot() == snapshot
+        assert graph_manager._total_length == pytest.approx(length, abs=1e-6)
+    assert graph_manager._total_length == pytest.approx(
+        measured_length(graph_manager), abs=1e-6)
+
+
+def test_evaluate_swaps_matches_handle_swap(graph_manager):
+    rng = np.random.default_rng(3)
+    customers = graph_manager.customers
+    for _ in range(500):
+        node1, node2 = (customers[index] for index
+                        in rng.integers(len(customers), size=2))
+        deltas, feasible = graph_manager.evaluate_swaps(
+            np.array([node1.id]), np.array([node2.id]))
+        delta = graph_manager.handle_swap(node1, node2)
+        if feasible[0]:
+            assert delta == pytest.approx(deltas[0], abs=1e-6)
+    assert graph_manager._total_length == pytest.approx(
+        measured_length(graph_manager), abs=1e-6)
@@ -0,0 +1,96 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.algorithms.models.node import Node, NodeList
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+ORDERS = os.path.join(DATA_DIR, 'orders_multiple_depots.csv')
+
+
+def test_depot_flags():
+    flags = [True, False, False, True]
+    for column in [flags, ['True', 'False', 'False', 'True'],
+                   np.array(['True', 'False', 'False', 'True'], dtype=object),
+                   [1, 0, 0, 1]]:
+        assert NodeList._depot_flags(column).tolist() == flags
+
+
+def test_parquet_with_text_flags(tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    pq = pytest.importorskip('pyarrow.parquet')
+    node_list = NodeList.from_csv(ORDERS)
+    path = str(tmp_path / 'orders.parquet')
+    # the columns as read from the csv, is_depot as 'True' and 'False'
+    pq.write_table(pa.table({
+        'city': node_list.names,
+        'order': node_list.weights,
+        'latitude': node_list.lats,
+        'longitude': node_list.lons,
+        'is_depot': [str(flag) for flag in node_list.is_depots.tolist()],
+    }), path)
+    np.testing.assert_array_equal(NodeList.from_parquet(path).is_depots,
+                                  node_list.is_depots)
+
+
+def assert_same_nodes(node_list, expected):
+    assert node_list.names == expected.names
+    np.testing.assert_array_equal(node_list.lats, expected.lats)
+    np.testing.assert_array_equal(node_list.lons, expected.lons)
+    np.testing.assert_array_equal(node_list.weights, expected.weights)
+    assert node_list.is_depots.dtype == bool
+    np.testing.assert_array_equal(node_list.is_depots, expected.is_depots)
+    assert node_list.ids_by_name == expected.ids_by_name
+    assert ([(node.id, node.name, node.is_depot) for node in node_list]
+            == [(node.id, node.name, node.is_depot) for node in expected])
+
+
+def test_csv():
+    node_list = NodeList.from_csv(ORDERS)
+    assert len(node_list) == 31
+    assert node_list.names[:2] == ['Kraków', 'Białystok']
+    assert node_list.is_depots.sum() == 2
+    assert node_list[0].is_depot and not node_list[1].is_depot
+    assert [node.id for node in node_list] == list(range(31))
+    assert node_list.ids_by_name['Białystok'] == 1
+    assert_same_nodes(NodeList.from_flie(ORDERS), node_list)
+
+
+def test_csv_round_trip(tmp_path):
+    node_list = NodeList.from_csv(ORDERS)
+    path = str(tmp_path / 'orders.csv')
+    node_list.to_csv(path)
+    assert_same_nodes(NodeList.from_flie(path), node_list)
+
+
+def test_npy_round_trip(tmp_path):
+    node_list = NodeList.from_csv(ORDERS)
+    path = str(tmp_path / 'orders.npy')
+    node_list.to_npy(path)
+    assert_same_nodes(NodeList.from_npy(path), node_list)
+    assert_same_nodes(NodeList.from_flie(path), node_list)
+
+
+def test_parquet(tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    pq = pytest.importorskip('pyarrow.parquet')
+    node_list = NodeList.from_csv(ORDERS)
+    path = str(tmp_path / 'orders.parquet')
+    pq.write_table(pa.table({
+        'city': node_list.names,
+        'order': node_list.weights,
+        'latitude': node_list.lats,
+        'longitude': node_list.lons,
+        'is_depot': node_list.is_depots,
+    }), path)
+    assert_same_nodes(NodeList.from_parquet(path), node_list)
+    assert_same_nodes(NodeList.from_flie(path), node_list)
+
+
+def test_nodes_match_columns():
+    expected = NodeList.from_csv(ORDERS)
+    node_list = NodeList([Node(node.name, node.lat, node.lon, node.weight,
+                               node.is_depot) for node in expected])
+    assert_same_nodes(node_list, expected)
@@ -0,0 +1,54 @@
+from src.algorithms.models.tabu_list import TabuList
+
+
+def test_evicts_oldest_entry():
+    tabu_list = TabuList(3)
+    tabu_list.extend([(1, 2), (3, 4), (5, 6)])
+    tabu_list.append((7, 8))
+    assert len(tabu_list) == 3
+    assert list(tabu_list) == [(3, 4), (5, 6), (7, 8)]
+    assert (1, 2) not in tabu_list
+    assert (7, 8) in tabu_list
+
+
+def test_repeated_entry_counts():
+    tabu_list = TabuList(3)
+    tabu_list.extend(['a', 'b', 'a'])
+    assert tabu_list._counts == {'a': 2, 'b': 1}
+    # evicting the first 'a' keeps the second one tabu
+    tabu_list.append('c')
+    assert 'a' in tabu_list
+    assert tabu_list._counts == {'a': 1, 'b': 1, 'c': 1}
+    tabu_list.extend(['d', 'e'])
+    assert 'a' not in tabu_list
+    assert list(tabu_list) == ['c', 'd', 'e']
+    assert tabu_list._counts == {'c': 1, 'd': 1, 'e': 1}
+
+
+def test_entry_filling_the_list():
+    tabu_list = TabuList(2)
+    tabu_list.extend(['a', 'a', 'a'])
+    assert len(tabu_list) == 2
+    assert tabu_list._counts == {'a': 2}
+    tabu_list.extend(['b', 'c'])
+    assert 'a' not in tabu_list
+    assert tabu_list._counts == {'b': 1, 'c': 1}
+
+
+def test_is_tabu():
+    tabu_list = TabuList(2)
+    tabu_list.extend([(1, 2), (2, 3)])
+    assert tabu_list.is_tabu([(5, 6), (2, 3)])
+    assert not tabu_list.is_tabu([(5, 6), (3, 2)])
+    assert not tabu_list.is_tabu([])
+
+
+def test_size_zero_and_clear():
+    empty = TabuList(0)
+    empty.append('a')
+    assert len(empty) == 0 and 'a' not in empty
+    tabu_list = TabuList(2)
+    tabu_list.extend(['a', 'b'])
+    tabu_list.clear()
+    assert len(tabu_list) == 0
+    assert not tabu_list.is_tabu(['a', 'b'])
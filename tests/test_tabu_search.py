@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from src.algorithms.models.moves import OPERATORS
+from src.algorithms.tabu_search import TabuSearch
+
+
+def feasible_moves(graph_manager, operator, seed=0, count=20):
+    """
+    Up to count feasible pairs of customer ids of operator.
+    """
+    rng = np.random.default_rng(seed)
+    ids = np.array([node.id for node in graph_manager.customers])
+    pairs = []
+    for _ in range(2000):
+        a, b = (int(node_id) for node_id in rng.choice(ids, 2, replace=False))
+        if operator.evaluate(graph_manager, a, b)[1]:
+            pairs.append((a, b))
+            if len(pairs) == count:
+                break
+    assert pairs
+    return pairs
+
+
+def routes(graph_manager):
+    return {node.id: graph_manager.node_routes[node.id]
+            for node in graph_manager.customers}
+
+
+@pytest.mark.parametrize('name', sorted(OPERATORS))
+def test_moved_nodes(graph_manager, name):
+    operator = OPERATORS[name]()
+    for a, b in feasible_moves(graph_manager, operator):
+        if not operator.evaluate(graph_manager, a, b)[1]:
+            continue
+        moved = operator.moved(graph_manager, a, b)
+        before = routes(graph_manager)
+        operator.apply(graph_manager, a, b)
+        after = routes(graph_manager)
+        for node, source, target in moved:
+            assert before[node] is source
+            assert after[node] is target
+        if name != 'two_opt_star':
+            # 2-opt* keeps a and b, only the customers after them move
+            assert a in {node for node, _, _ in moved}
+        # exactly the customers which changed their route
+        assert ({node for node in before if before[node] is not after[node]}
+                == {node for node, source, target in moved
+                    if source is not target})
+
+
+@pytest.mark.parametrize('name', sorted(OPERATORS))
+def test_node_route_attributes(graph_manager, name):
+    operator = OPERATORS[name]()
+    tabu_search = TabuSearch(graph_manager, max_iterations=1, tabu_size=100,
+                             tabu_attribute='node_route',
+                             operators=(operator,))
+    solution = tabu_search.current_best
+    a, b = feasible_moves(solution, operator)[0]
+    moved = operator.moved(solution, a, b)
+    checked, recorded = tabu_search.move_attributes(solution, operator, a, b)
+    assert moved
+    assert checked == tuple((node, target) for node, _, target in moved)
+    assert recorded == tuple((node, source) for node, source, _ in moved)
+
+
+def test_relocate_back_is_tabu(graph_manager):
+    operator = OPERATORS['relocate']()
+    tabu_search = TabuSearch(graph_manager, max_iterations=1, tabu_size=100,
+                             tabu_attribute='node_route',
+                             operators=(operator,))
+    solution = tabu_search.current_best
+    arrays = solution.route_arrays()
+    # a follows a customer, so it can be relocated back after it
+    a, b = next((a, b) for a, b in feasible_moves(solution, operator)
+                if not arrays.is_depots[arrays.pred[a]])
+    pred = int(arrays.pred[a])
+    _, recorded = tabu_search.move_attributes(solution, operator, a, b)
+    # only the relocated customer is made tabu, not b
+    assert [node for node, _ in recorded] == [a]
+    operator.apply(solution, a, b)
+    tabu_search.tabu_list.extend(recorded)
+    checked, _ = tabu_search.move_attributes(solution, operator, a, pred)
+    assert tabu_search.tabu_list.is_tabu(checked)
+    checked, _ = tabu_search.move_attributes(solution, operator, b, a)
+    assert not tabu_search.tabu_list.is_tabu(checked)